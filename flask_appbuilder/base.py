@@ -144,6 +144,8 @@ class AppBuilder(object):
         app.config.setdefault('LANGUAGES',
                               {'en': {'flag': 'gb', 'name': 'English'}})
         app.config.setdefault('ADDON_MANAGERS',[])
+        app.config.setdefault('FAB_UPDATE_PERMS', True)
+        app.config.setdefault('FAB_PERMISSIONS_BULK_SYNC', False)
         if self.security_manager_class is None:
             from flask_appbuilder.security.sqla.manager import SecurityManager
             self.security_manager_class = SecurityManager
@@ -154,17 +156,25 @@ class AppBuilder(object):
         self._add_global_static()
         self._add_global_filters()
         app.before_request(self.sm.before_request)
-        self._add_admin_views()
-        self._add_addon_views()
-        self._add_menu_permissions()
-        if not self.app:
-            for baseview in self.baseviews:
-                # instantiate the views and add session
-                self._check_and_init(baseview)
-                # Register the views has blueprints
-                self.register_blueprint(baseview)
-                # Add missing permissions where needed
-                self._add_permission(baseview)
+        # bump the security version once for all the permissions added on init
+        with self.sm.permission_batch():
+            self._add_admin_views()
+            self._add_addon_views()
+            self._add_menu_permissions()
+            if not self.app:
+                for baseview in self.baseviews:
+                    # instantiate the views and add session
+                    self._check_and_init(baseview)
+                    # Register the views has blueprints
+                    self.register_blueprint(baseview)
+                    # Add missing permissions where needed
+                    self._add_permission(baseview)
+        if self.update_perms and self.permissions_bulk_sync:
+            if self.app:
+                # views are still going to be added, sync them all later
+                app.before_first_request(self.sync_permissions)
+            else:
+                self.sync_permissions()
         self._init_extension(app)
 
     def _init_extension(self, app):
@@ -220,6 +230,27 @@ class AppBuilder(object):
         """
         return self.get_app.config['APP_ICON']
 
+    @property
+    def update_perms(self):
+        """
+            If False views and menus permissions are not synced
+            with the backend on startup, use fabmanager sync-permissions
+            to do it once per deploy
+
+            :return: Boolean
+        """
+        return self.get_app.config['FAB_UPDATE_PERMS']
+
+    @property
+    def permissions_bulk_sync(self):
+        """
+            If True permissions are synced in bulk, for all views
+            and menus at once, instead of one view at a time
+
+            :return: Boolean
+        """
+        return self.get_app.config['FAB_PERMISSIONS_BULK_SYNC']
+
     @property
     def languages(self):
         return self.get_app.config['LANGUAGES']
@@ -273,19 +304,27 @@ class AppBuilder(object):
                     log.error(LOGMSG_ERR_FAB_ADDON_PROCESS.format(addon, e))
 
     def _add_permissions_menu(self, name):
+        if not self.update_perms or self.permissions_bulk_sync:
+            return
         try:
             self.sm.add_permissions_menu(name)
         except Exception as e:
             log.exception(e)
             log.error(LOGMSG_ERR_FAB_ADD_PERMISSION_MENU.format(str(e)))
 
-    def _add_menu_permissions(self):
+    def _get_menu_names(self):
+        menu_names = []
         for category in self.menu.get_list():
-            self._add_permissions_menu(category.name)
+            menu_names.append(category.name)
             for item in category.childs:
                 # dont add permission for menu separator
                 if item.name != '-':
-                    self._add_permissions_menu(item.name)
+                    menu_names.append(item.name)
+        return menu_names
+
+    def _add_menu_permissions(self):
+        for menu_name in self._get_menu_names():
+            self._add_permissions_menu(menu_name)
 
     def _check_and_init(self, baseview):
         # If class if not instantiated, instantiate it
@@ -423,7 +462,7 @@ class AppBuilder(object):
             log.warning(LOGMSG_WAR_FAB_VIEW_EXISTS.format(baseview.__class__.__name__))
         return baseview
 
-    def security_cleanup(self):
+    def security_cleanup(self, dry_run=False):
         """
             This method is useful if you have changed
             the name of your menus or classes,
@@ -435,8 +474,28 @@ class AppBuilder(object):
             that is no longer part of any registered view or menu.
 
             Remember invoke ONLY AFTER YOU HAVE REGISTERED ALL VIEWS
+
+            :param dry_run: If True nothing is deleted,
+                only the planned deletions are returned
+            :return: tuple with the list of deleted view menu names
+                and the list of deleted (permission_name, view_menu_name)
+        """
+        return self.sm.security_cleanup(self.baseviews, self.menu, dry_run=dry_run)
+
+    def sync_permissions(self):
+        """
+            Syncs the permissions of all registered views and menus
+            with the backend in bulk. Adds missing permissions and
+            removes view permissions that no longer exist.
+
+            Remember invoke ONLY AFTER YOU HAVE REGISTERED ALL VIEWS
+
+            :return: tuple with lists of added and removed
+                (permission_name, view_menu_name)
         """
-        self.sm.security_cleanup(self.baseviews, self.menu)
+        view_permissions = dict((baseview.__class__.__name__, baseview.base_permissions)
+                                for baseview in self.baseviews)
+        return self.sm.sync_permissions(view_permissions, self._get_menu_names())
 
     @property
     def get_url_for_login(self):
@@ -458,6 +517,8 @@ class AppBuilder(object):
         return url_for('%s.%s' % (self.bm.locale_view.endpoint, self.bm.locale_view.default_view), locale=lang)
 
     def _add_permission(self, baseview):
+        if not self.update_perms or self.permissions_bulk_sync:
+            return
         try:
             self.sm.add_permissions_view(baseview.base_permissions, baseview.__class__.__name__)
         except Exception as e:
@@ -383,7 +383,10 @@ class BaseModelView(BaseView):
     _base_filters = None
     """ Internal base Filter from class Filters will always filter view """
     _filters = None
-    """ Filters object will calculate all possible filter types based on search_columns """
+    """
+        Filters catalog with all possible filter types based on search_columns,
+        shared by all requests so it never holds active filters
+    """
 
     def __init__(self, **kwargs):
         """
@@ -431,14 +434,25 @@ class BaseModelView(BaseView):
                                                 extra_fields=self.search_form_extra_fields,
                                                 filter_rel_fields=self.search_form_query_rel_fields)
 
-    def _get_search_widget(self, form=None, exclude_cols=None, widgets=None):
+    def _get_request_filters(self):
+        """
+            Returns a new Filters object with the active filters
+            on the request URL, safe to use by concurrent requests
+        """
+        filters = self._filters.empty_copy()
+        get_filter_args(filters)
+        return filters
+
+    def _get_search_widget(self, form=None, exclude_cols=None, widgets=None, filters=None):
         exclude_cols = exclude_cols or []
         widgets = widgets or {}
+        if filters is None:
+            filters = self._get_request_filters()
         widgets['search'] = self.search_widget(route_base=self.route_base,
                                                form=form,
                                                include_cols=self.search_columns,
                                                exclude_cols=exclude_cols,
-                                               filters=self._filters
+                                               filters=filters
         )
         return widgets
 
@@ -518,6 +532,12 @@ class BaseCRUDView(BaseModelView):
     """
         Use this property to change default page size
     """
+    list_count = True
+    """
+        If False the list will not count all records, it will only
+        know if there is a next page. Use it on very large tables where
+        a count is too expensive, a next/previous pager is rendered
+    """
     show_fieldsets = None
     """
         show fieldsets django style [(<'TITLE'|None>, {'fields':[<F1>,<F2>,...]}),....]
@@ -598,6 +618,13 @@ class BaseCRUDView(BaseModelView):
                 edit_form_query_rel_fields = {'group':[['name',FilterStartsWith,'W']]}
 
     """
+    related_ajax_threshold = 1000
+    """
+        Related fields on add and edit forms with more rows than this
+        don't render all choices, the browser fetches them paged and
+        searchable from the api_column_add/api_column_edit endpoints.
+        Set it to None to always render all choices.
+    """
 
     add_form = None
     """ To implement your own, assign WTF form for Add """
@@ -647,14 +674,27 @@ class BaseCRUDView(BaseModelView):
                                              self.description_columns,
                                              self.validators_columns,
                                              self.add_form_extra_fields,
-                                             self.add_form_query_rel_fields)
+                                             self.add_form_query_rel_fields,
+                                             self.related_ajax_threshold,
+                                             self._get_related_endpoint_func('add'))
         if not self.edit_form:
             self.edit_form = conv.create_form(self.label_columns,
                                               self.edit_columns,
                                               self.description_columns,
                                               self.validators_columns,
                                               self.edit_form_extra_fields,
-                                              self.edit_form_query_rel_fields)
+                                              self.edit_form_query_rel_fields,
+                                              self.related_ajax_threshold,
+                                              self._get_related_endpoint_func('edit'))
+
+    def _get_related_endpoint_func(self, form_type):
+        """
+            Returns a function that gets the URL of the paged choices
+            for a related column, None if the view has no such endpoint.
+
+            :param form_type: 'add' or 'edit'
+        """
+        return None
 
     def _init_titles(self):
         """
@@ -772,6 +812,27 @@ class BaseCRUDView(BaseModelView):
         """
         return self._get_list_widget(**kwargs).get('list')
 
+    def _query_page(self, filters, order_column='', order_direction='', page=None, page_size=None,
+                    cursor=None):
+        """
+            Queries one page of the list, honouring list_count.
+            When paging with a keyset cursor the count is not queried.
+
+            :return: tuple with count, has_next and the list of items,
+                count is None if list_count is False or a cursor is used
+        """
+        count, lst = self.datamodel.query(filters, order_column, order_direction,
+                                          page=page, page_size=page_size,
+                                          with_count=self.list_count and not cursor,
+                                          cursor=cursor,
+                                          select_columns=self.list_columns)
+        if count is None:
+            has_next = len(lst) > page_size
+            lst = lst[:page_size]
+        else:
+            has_next = bool(page_size) and ((page or 0) + 1) * page_size < count
+        return count, has_next, lst
+
     def _get_list_widget(self, filters,
                          actions=None,
                          order_column='',
@@ -788,7 +849,8 @@ class BaseCRUDView(BaseModelView):
         if not order_column and self.base_order:
             order_column, order_direction = self.base_order
         joined_filters = filters.get_joined_filters(self._base_filters)
-        count, lst = self.datamodel.query(joined_filters, order_column, order_direction, page=page, page_size=page_size)
+        count, has_next, lst = self._query_page(joined_filters, order_column, order_direction,
+                                                page=page, page_size=page_size)
         pks = self.datamodel.get_keys(lst)
         widgets['list'] = self.list_widget(label_columns=self.label_columns,
                                            include_columns=self.list_columns,
@@ -798,6 +860,7 @@ class BaseCRUDView(BaseModelView):
                                            page=page,
                                            page_size=page_size,
                                            count=count,
+                                           has_next=has_next,
                                            pks=pks,
                                            actions=actions,
                                            filters=filters,
@@ -869,15 +932,15 @@ class BaseCRUDView(BaseModelView):
             order_column, order_direction = '', ''
         page = get_page_args().get(self.__class__.__name__)
         page_size = get_page_size_args().get(self.__class__.__name__)
-        get_filter_args(self._filters)
-        widgets = self._get_list_widget(filters=self._filters,
+        filters = self._get_request_filters()
+        widgets = self._get_list_widget(filters=filters,
                                         order_column=order_column,
                                         order_direction=order_direction,
                                         page=page,
                                         page_size=page_size)
         form = self.search_form.refresh()
         self.update_redirect()
-        return self._get_search_widget(form=form, widgets=widgets)
+        return self._get_search_widget(form=form, widgets=widgets, filters=filters)
 
 
     def _show(self, pk):
@@ -903,12 +966,12 @@ class BaseCRUDView(BaseModelView):
             returns add widget or None
         """
         is_valid_form = True
-        get_filter_args(self._filters)
-        exclude_cols = self._filters.get_relation_cols()
+        filters = self._get_request_filters()
+        exclude_cols = filters.get_relation_cols()
         form = self.add_form.refresh()
 
         if request.method == 'POST':
-            self._fill_form_exclude_cols(exclude_cols, form)
+            self._fill_form_exclude_cols(exclude_cols, form, filters)
             if form.validate():
                 item = self.datamodel.obj()
                 form.populate_obj(item)
@@ -938,8 +1001,8 @@ class BaseCRUDView(BaseModelView):
         pages = get_page_args()
         page_sizes = get_page_size_args()
         orders = get_order_args()
-        get_filter_args(self._filters)
-        exclude_cols = self._filters.get_relation_cols()
+        filters = self._get_request_filters()
+        exclude_cols = filters.get_relation_cols()
 
         item = self.datamodel.get(pk, self._base_filters)
         if not item:
@@ -950,7 +1013,7 @@ class BaseCRUDView(BaseModelView):
         if request.method == 'POST':
             form = self.edit_form.refresh(request.form)
             # fill the form with the suppressed cols, generated from exclude_cols
-            self._fill_form_exclude_cols(exclude_cols, form)
+            self._fill_form_exclude_cols(exclude_cols, form, filters)
             # trick to pass unique validation
             form._id = pk
             if form.validate():
@@ -998,18 +1061,39 @@ class BaseCRUDView(BaseModelView):
             flash(*self.datamodel.message)
             self.update_redirect()
 
+    def _delete_all(self, items):
+        """
+            Bulk delete function logic, override to implement different logic
+            deletes all records on the list in one go, use it on a
+            delete action.
+
+            :param items:
+                list of records to delete
+        """
+        try:
+            self.pre_delete_all(items)
+        except Exception as e:
+            flash(str(e), "danger")
+        else:
+            if self.datamodel.delete_all(items):
+                self.post_delete_all(items)
+            flash(*self.datamodel.message)
+            self.update_redirect()
+
     """
     ------------------------------------------------
                 HELPER FUNCTIONS
     ------------------------------------------------
     """
 
-    def _fill_form_exclude_cols(self, exclude_cols, form):
+    def _fill_form_exclude_cols(self, exclude_cols, form, filters=None):
         """
             fill the form with the suppressed cols, generated from exclude_cols
         """
+        if filters is None:
+            filters = self._get_request_filters()
         for filter_key in exclude_cols:
-            filter_value = self._filters.get_filter_value(filter_key)
+            filter_value = filters.get_filter_value(filter_key)
             rel_obj = self.datamodel.get_related_obj(filter_key, filter_value)
             if hasattr(form, filter_key):
                 field = getattr(form, filter_key)
@@ -1062,3 +1146,22 @@ class BaseCRUDView(BaseModelView):
             Override this, will be called after delete
         """
         pass
+
+    def pre_delete_all(self, items):
+        """
+            Override this, will be called before a bulk delete
+            with the list of records, by default calls pre_delete
+            for each one. If an exception is raised the whole
+            delete operation is aborted.
+        """
+        for item in items:
+            self.pre_delete(item)
+
+    def post_delete_all(self, items):
+        """
+            Override this, will be called after a bulk delete
+            with the list of records, by default calls post_delete
+            for each one.
+        """
+        for item in items:
+            self.post_delete(item)
@@ -160,13 +160,27 @@ class GroupByChartView(BaseChartView):
         if not self.datamodel.get_order_columns_list([order_column]):
             order_column = ''
             order_direction = ''
-        count, lst = self.datamodel.query(filters=joined_filters,
-                                          order_column=order_column,
-                                          order_direction=order_direction)
         if not definition:
             definition = self.definitions[0]
         group = self.get_group_by_class(definition)
-        value_columns = group.to_json(group.apply(lst, sort=order_column == ''), self.label_columns)
+        rows = None
+        # the database groups and orders ascending by the group column
+        if order_column in ('', definition['group']) and order_direction != 'desc' and \
+                isinstance(group, GroupByProcessData):
+            rows = self.datamodel.query_aggregate(definition['group'], definition['series'],
+                                                  filters=joined_filters)
+        if rows is not None:
+            value_columns = group.to_json(group.format_rows(rows), self.label_columns)
+        else:
+            # custom aggregate functions or methods, group in python
+            select_columns = list(group.group_bys_cols)
+            for serie in definition['series']:
+                select_columns.append(serie[1] if isinstance(serie, tuple) else serie)
+            count, lst = self.datamodel.query(filters=joined_filters,
+                                              order_column=order_column,
+                                              order_direction=order_direction,
+                                              select_columns=select_columns)
+            value_columns = group.to_json(group.apply(lst, sort=order_column == ''), self.label_columns)
         widgets['chart'] = self.chart_widget(route_base=self.route_base,
                                              chart_title=self.chart_title,
                                              chart_type=self.chart_type,
@@ -183,12 +197,12 @@ class GroupByChartView(BaseChartView):
     def chart(self, group_by=0):
         group_by = int(group_by)
         form = self.search_form.refresh()
-        get_filter_args(self._filters)
-        widgets = self._get_chart_widget(filters=self._filters,
+        filters = self._get_request_filters()
+        widgets = self._get_chart_widget(filters=filters,
                                          definition=self.definitions[group_by],
                                          order_column=self.definitions[group_by]['group'],
                                          order_direction='asc')
-        widgets = self._get_search_widget(form=form, widgets=widgets)
+        widgets = self._get_search_widget(form=form, widgets=widgets, filters=filters)
         self.update_redirect()
         return self.render_template(self.chart_template, route_base=self.route_base,
                                     title=self.chart_title,
@@ -319,7 +333,8 @@ class BaseSimpleDirectChartView(BaseChartView):
         joined_filters = filters.get_joined_filters(self._base_filters)
         count, lst = self.datamodel.query(filters=joined_filters,
                                           order_column=order_column,
-                                          order_direction=order_direction)
+                                          order_direction=order_direction,
+                                          select_columns=list(direct))
         value_columns = self.datamodel.get_values(lst, list(direct))
         value_columns = dict_to_json(direct[0], direct[1:], self.label_columns, value_columns)
 
@@ -348,12 +363,12 @@ class ChartView(BaseSimpleGroupByChartView):
     @has_access
     def chart(self, group_by=''):
         form = self.search_form.refresh()
-        get_filter_args(self._filters)
+        filters = self._get_request_filters()
 
         group_by = group_by or self.group_by_columns[0]
 
-        widgets = self._get_chart_widget(filters=self._filters, group_by=group_by)
-        widgets = self._get_search_widget(form=form, widgets=widgets)
+        widgets = self._get_chart_widget(filters=filters, group_by=group_by)
+        widgets = self._get_search_widget(form=form, widgets=widgets, filters=filters)
         return self.render_template(self.chart_template, route_base=self.route_base,
                                     title=self.chart_title,
                                     label_columns=self.label_columns,
@@ -410,16 +425,16 @@ class TimeChartView(BaseSimpleGroupByChartView):
     @has_access
     def chart(self, group_by='', period=''):
         form = self.search_form.refresh()
-        get_filter_args(self._filters)
+        filters = self._get_request_filters()
 
         group_by = group_by or self.group_by_columns[0]
 
-        widgets = self._get_chart_widget(filters=self._filters,
+        widgets = self._get_chart_widget(filters=filters,
                                          group_by=group_by,
                                          period=period,
                                          height=self.height)
 
-        widgets = self._get_search_widget(form=form, widgets=widgets)
+        widgets = self._get_search_widget(form=form, widgets=widgets, filters=filters)
         return self.render_template(self.chart_template, route_base=self.route_base,
                                     title=self.chart_title,
                                     label_columns=self.label_columns,
@@ -453,7 +468,7 @@ class DirectChartView(BaseSimpleDirectChartView):
     @has_access
     def chart(self, group_by=''):
         form = self.search_form.refresh()
-        get_filter_args(self._filters)
+        filters = self._get_request_filters()
 
         direct_key = group_by or list(self.direct_columns.keys())[0]
 
@@ -464,11 +479,11 @@ class DirectChartView(BaseSimpleDirectChartView):
         else:
             order_column, order_direction = '', ''
 
-        widgets = self._get_chart_widget(filters=self._filters,
+        widgets = self._get_chart_widget(filters=filters,
                                          order_column=order_column,
                                          order_direction=order_direction,
                                          direct=direct)
-        widgets = self._get_search_widget(form=form, widgets=widgets)
+        widgets = self._get_search_widget(form=form, widgets=widgets, filters=filters)
         return self.render_template(self.chart_template, route_base=self.route_base,
                                     title=self.chart_title,
                                     label_columns=self.label_columns,
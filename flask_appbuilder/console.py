@@ -10,6 +10,7 @@ import click
 import os
 import shutil
 import sys
+import time
 from zipfile import ZipFile
 from . import const as c
 
@@ -149,13 +150,47 @@ def version(app, appbuilder):
 @cli_app.command("security-cleanup")
 @click.option('--app', default='app', help='Your application init directory (package)')
 @click.option('--appbuilder', default='appbuilder', help='your AppBuilder object')
-def security_cleanup(app, appbuilder):
+@click.option('--dry-run', is_flag=True, default=False, help='Only print the planned deletions')
+def security_cleanup(app, appbuilder, dry_run):
     """
         Cleanup unused permissions from views and roles.
     """
     _appbuilder = import_application(app, appbuilder)
-    _appbuilder.security_cleanup()
-    click.echo(click.style('Finished security cleanup', fg='green'))
+    start = time.time()
+    view_menu_names, perm_views = _appbuilder.security_cleanup(dry_run=dry_run)
+    elapsed = time.time() - start
+    if not dry_run and not view_menu_names and _appbuilder.security_cleanup(dry_run=True)[0]:
+        # nothing was deleted but there are unused view menus
+        click.echo(click.style('Security cleanup failed, nothing was removed', fg='red'))
+        exit(1)
+    action = 'Would remove' if dry_run else 'Removed'
+    for permission_name, view_menu_name in perm_views:
+        click.echo(click.style('{0} {1} on {2}'.format(action, permission_name, view_menu_name), fg='red'))
+    for view_menu_name in view_menu_names:
+        click.echo(click.style('{0} view menu {1}'.format(action, view_menu_name), fg='red'))
+    click.echo(click.style('Finished security cleanup{0}, {1} view menus {2} permissions in {3:.2f}s'.format(
+        ' (dry run)' if dry_run else '', len(view_menu_names), len(perm_views), elapsed), fg='green'))
+
+
+@cli_app.command("sync-permissions")
+@click.option('--app', default='app', help='Your application init directory (package)')
+@click.option('--appbuilder', default='appbuilder', help='your AppBuilder object')
+def sync_permissions(app, appbuilder):
+    """
+        Sync all views and menus permissions with the database.
+    """
+    _appbuilder = import_application(app, appbuilder)
+    try:
+        added, removed = _appbuilder.sync_permissions()
+    except Exception as e:
+        click.echo(click.style('Permissions sync failed, no changes were made: {0}'.format(e), fg='red'))
+        exit(1)
+    for permission_name, view_menu_name in added:
+        click.echo(click.style('Added {0} on {1}'.format(permission_name, view_menu_name), fg='green'))
+    for permission_name, view_menu_name in removed:
+        click.echo(click.style('Removed {0} on {1}'.format(permission_name, view_menu_name), fg='red'))
+    click.echo(click.style('Finished permissions sync, added {0} removed {1}'.format(len(added), len(removed)),
+                           fg='green'))
 
 
 @cli_app.command("list-views")
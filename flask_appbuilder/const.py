@@ -52,8 +52,16 @@ LOGMSG_ERR_SEC_ADD_USER = "Error adding new user to database. {0}"
 """ Error adding user, format with err message """
 LOGMSG_ERR_SEC_UPD_USER = "Error updating user to database. {0} "
 """ Error updating user, format with err message """
+LOGMSG_ERR_SEC_UPD_VERSION = "Error updating security version. {0}"
+""" Error updating the security version, format with err message """
+LOGMSG_ERR_SEC_GET_VERSION = "Error reading security version. {0}"
+""" Error reading the security version, format with err message """
 LOGMSG_WAR_SEC_NO_USER = "No user yet created, use fabmanager command to do it."
 """ Warning when app starts if no user exists on db """
+LOGMSG_WAR_SEC_NO_ADMIN_ROLE = "Role {0} not found, permissions were not granted to it"
+""" Warning when syncing permissions without the admin role, format with role name """
+LOGMSG_ERR_SEC_SYNC_PERMS = "Error syncing permissions. {0}"
+""" Error syncing permissions in bulk, format with err message """
 LOGMSG_WAR_SEC_NOLDAP_OBJ = "User self registration failed no LDAP object found for: {0}"
 
 LOGMSG_INF_SEC_ADD_PERMVIEW = "Created Permission View: {0}"
@@ -93,6 +101,8 @@ LOGMSG_ERR_DBI_EDIT_GENERIC = "Edit record error: {0}"
 LOGMSG_ERR_DBI_DEL_GENERIC = "Delete record error: {0}"
 """ Database delete generic error, format with err message """
 LOGMSG_WAR_DBI_AVG_ZERODIV = "Zero division on aggregate_avg"
+LOGMSG_WAR_DBI_QUERY_CACHE = "Query cache error: {0}"
+""" Query cache backend error, format with err message """
 
 LOGMSG_WAR_FAB_VIEW_EXISTS = "View already exists {0} ignoring"
 """ Attempt to add an already added view, format with view name """
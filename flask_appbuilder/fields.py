@@ -19,13 +19,21 @@ class AJAXSelectField(Field):
         :param: datamodel: An initialized SQLAInterface with a model
         :param: col_name: The column that maps to the model
         :param: is_related: If the model column is a relationship or direct on this case use col_name with the pk
+        :param: multiple: If the field holds a list of related objects, sent as comma separated primary keys
     """
 
-    def __init__(self, label=None, validators=None, datamodel=None, col_name=None, is_related=True, **kwargs):
+    def __init__(self, label=None, validators=None, datamodel=None, col_name=None, is_related=True,
+                 multiple=False, **kwargs):
         super(AJAXSelectField, self).__init__(label, validators, **kwargs)
         self.datamodel = datamodel
         self.col_name = col_name
         self.is_related = is_related
+        self.multiple = multiple
+
+    def _get_datamodel(self):
+        if self.is_related:
+            return self.datamodel.get_related_interface(self.col_name)
+        return self.datamodel
 
     def process_data(self, value):
         """
@@ -38,13 +46,35 @@ class AJAXSelectField(Field):
         :param value: The python object containing the value to process.
         """
         if value:
-            if self.is_related:
+            if self.multiple and self.is_related:
+                datamodel = self._get_datamodel()
+                self.data = ','.join(text_type(datamodel.get_pk_value(item)) for item in value)
+            elif self.multiple:
+                self.data = self.datamodel.get_many(value)
+            elif self.is_related:
                 self.data = self.datamodel.get_related_interface(self.col_name).get_pk_value(value)
             else:
                 self.data = self.datamodel.get(value)
         else:
             self.data = None
 
+    def get_selection(self):
+        """
+            Returns the selected records as a list of {'id', 'text'}
+            to initialize the select2 widget
+        """
+        data = self.data
+        if not data:
+            return []
+        datamodel = self._get_datamodel()
+        if isinstance(data, (list, tuple)):
+            items = data
+        elif isinstance(data, string_types) or isinstance(data, int):
+            items = datamodel.get_many([pk for pk in text_type(data).split(',') if pk])
+        else:
+            items = [data]
+        return [{'id': text_type(datamodel.get_pk_value(item)), 'text': text_type(item)} for item in items]
+
     def process_formdata(self, valuelist):
         """
         Process data received over the wire from a form.
@@ -56,7 +86,10 @@ class AJAXSelectField(Field):
         :param valuelist: A list of strings to process.
         """
         if valuelist:
-            if self.is_related:
+            if self.multiple:
+                pks = [pk for value in valuelist for pk in value.split(',') if pk]
+                self.data = self._get_datamodel().get_many(pks)
+            elif self.is_related:
                 self.data = self.datamodel.get_related_interface(self.col_name).get(valuelist[0])
             else:
                 self.data = self.datamodel.get(valuelist[0])
@@ -65,15 +98,25 @@ class AJAXSelectField(Field):
 class QuerySelectField(SelectFieldBase):
     """
         Based on WTForms QuerySelectField
+
+        If get_many_func is given, submitted keys are looked up with it
+        instead of scanning all the choices. If ajax_threshold and
+        ajax_endpoint_func are also given, and the query returns more
+        than ajax_threshold rows, the field is lazy: only the selected
+        choices are rendered and the browser pages the rest from the endpoint.
     """
     widget = widgets.Select()
 
     def __init__(self, label=None, validators=None, query_func=None,
                  get_pk_func=None, get_label=None, allow_blank=False,
-                 blank_text='', **kwargs):
+                 blank_text='', get_many_func=None, ajax_threshold=None,
+                 ajax_endpoint_func=None, **kwargs):
         super(QuerySelectField, self).__init__(label, validators, **kwargs)
         self.query_func = query_func
         self.get_pk_func = get_pk_func
+        self.get_many_func = get_many_func
+        self.ajax_threshold = ajax_threshold
+        self.ajax_endpoint_func = ajax_endpoint_func
 
         if get_label is None:
             self.get_label = lambda x: x
@@ -85,9 +128,34 @@ class QuerySelectField(SelectFieldBase):
         self.allow_blank = allow_blank
         self.blank_text = blank_text
         self._object_list = None
+        self._invalid_formdata = False
+        self._lazy = None
+
+    def is_lazy(self):
+        """
+            Returns True if choices are too many to be rendered,
+            query_func is called with a page size to find out.
+        """
+        if self._lazy is None:
+            self._lazy = False
+            if self.ajax_threshold and self.ajax_endpoint_func and self.get_many_func:
+                objs = list(self.query_func(self.ajax_threshold + 1))
+                if len(objs) > self.ajax_threshold:
+                    self._lazy = True
+                else:
+                    self._object_list = list((text_type(self.get_pk_func(obj)), obj) for obj in objs)
+        return self._lazy
 
     def _get_data(self):
-        if self._formdata is not None:
+        if self._formdata is not None and self.get_many_func:
+            if self._formdata and not self._invalid_formdata:
+                # fetch only the submitted key
+                objs = self.get_many_func([self._formdata])
+                if objs:
+                    self._set_data(objs[0])
+                else:
+                    self._invalid_formdata = True
+        elif self._formdata is not None:
             for pk, obj in self._get_object_list():
                 if pk == self._formdata:
                     self._set_data(obj)
@@ -102,10 +170,17 @@ class QuerySelectField(SelectFieldBase):
 
     def _get_object_list(self):
         if self._object_list is None:
+            if self.is_lazy():
+                return self._get_selected_object_list()
             objs = self.query_func()
             self._object_list = list((text_type(self.get_pk_func(obj)), obj) for obj in objs)
         return self._object_list
 
+    def _get_selected_object_list(self):
+        if self.data is None:
+            return []
+        return [(text_type(self.get_pk_func(self.data)), self.data)]
+
     def iter_choices(self):
         if self.allow_blank:
             yield ('__None', self.blank_text, self.data is None)
@@ -124,6 +199,9 @@ class QuerySelectField(SelectFieldBase):
     def pre_validate(self, form):
         data = self.data
         if data is not None:
+            if self.get_many_func:
+                # already looked up with the related query filters
+                return
             for pk, obj in self._get_object_list():
                 if data == obj:
                     break
@@ -150,11 +228,23 @@ class QuerySelectMultipleField(QuerySelectField):
         if kwargs.get('allow_blank', False):
             import warnings
             warnings.warn('allow_blank=True does not do anything for QuerySelectMultipleField.')
-        self._invalid_formdata = False
+        self._unknown_formdata = []
 
     def _get_data(self):
         formdata = self._formdata
-        if formdata is not None:
+        if formdata is not None and self.get_many_func:
+            # fetch only the submitted keys, on one query
+            objs = {}
+            if formdata:
+                # keys are matched as submitted, '01' is not a valid choice for 1
+                objs = dict((text_type(self.get_pk_func(obj)), obj)
+                            for obj in self.get_many_func(list(formdata)))
+            data = [obj for pk, obj in objs.items() if pk in formdata]
+            self._unknown_formdata = sorted(formdata - set(objs))
+            if self._unknown_formdata:
+                self._invalid_formdata = True
+            self._set_data(data)
+        elif formdata is not None:
             data = []
             for pk, obj in self._get_object_list():
                 if not formdata:
@@ -173,17 +263,28 @@ class QuerySelectMultipleField(QuerySelectField):
 
     data = property(_get_data, _set_data)
 
+    def _get_selected_object_list(self):
+        return [(text_type(self.get_pk_func(obj)), obj) for obj in self.data or []]
+
     def iter_choices(self):
         for pk, obj in self._get_object_list():
             yield (pk, self.get_label(obj), obj in self.data)
 
     def process_formdata(self, valuelist):
+        if self.ajax_threshold:
+            # lazy fields post comma separated keys
+            valuelist = [pk for value in valuelist for pk in value.split(',') if pk]
         self._formdata = set(valuelist)
 
     def pre_validate(self, form):
-        if self._invalid_formdata:
+        # resolves the submitted keys first
+        data = self.data
+        if self._unknown_formdata:
+            raise ValidationError('{0}: {1}'.format(self.gettext('Not a valid choice'),
+                                                    ', '.join(self._unknown_formdata)))
+        elif self._invalid_formdata:
             raise ValidationError(self.gettext('Not a valid choice'))
-        elif self.data:
+        elif data and not self.get_many_func:
             obj_list = list(x[1] for x in self._get_object_list())
             if not isinstance(self.data, list):
                 self.data = [self.data]
@@ -1,5 +1,7 @@
+import json
 from wtforms.widgets import HTMLString, html_params
 from wtforms import fields, widgets, TextField
+from wtforms.compat import text_type
 from flask_babel import lazy_gettext as _
 
 
@@ -80,8 +82,20 @@ class BS3PasswordFieldWidget(widgets.PasswordInput):
         return super(BS3PasswordFieldWidget, self).__call__(field, **kwargs)
 
 
+def _select2_ajax_params(field, kwargs):
+    """
+        Sets the value and the initial selection of a select2 AJAX input
+    """
+    if hasattr(field, 'get_selection'):
+        selection = field.get_selection()
+    else:
+        selection = [{'id': text_type(field.data), 'text': text_type(field.data)}] if field.data else []
+    kwargs['data-selection'] = json.dumps(selection)
+    return html_params(type='hidden', value=','.join(item['id'] for item in selection), **kwargs)
+
+
 class Select2AJAXWidget(object):
-    data_template = ('<input %(text)s"></input>')
+    data_template = ('<input %(text)s/>')
 
     def __init__(self, endpoint, extra_classes=None, style=None):
         self.endpoint = endpoint
@@ -97,18 +111,15 @@ class Select2AJAXWidget(object):
         if self.extra_classes:
             input_classes = input_classes + ' ' + self.extra_classes
         kwargs.setdefault('class', input_classes)
-        if not field.data:
-            field.data = ""
+        if getattr(field, 'multiple', False):
+            kwargs.setdefault('data-multiple', u'true')
         template = self.data_template
 
-        return HTMLString(template % {'text': html_params(type='text',
-                                      value=field.data,
-                                      **kwargs)
-                                      })
+        return HTMLString(template % {'text': _select2_ajax_params(field, kwargs)})
 
 
 class Select2SlaveAJAXWidget(object):
-    data_template = ('<input class="input-group my_select2_ajax_slave" %(text)s"></input>')
+    data_template = ('<input class="input-group my_select2_ajax_slave" %(text)s/>')
 
     def __init__(self, master_id, endpoint, extra_classes=None, style=None):
         self.endpoint = endpoint
@@ -126,15 +137,40 @@ class Select2SlaveAJAXWidget(object):
         if self.extra_classes:
             input_classes = input_classes + ' ' + self.extra_classes
         kwargs.setdefault('class', input_classes)
-
-        if not field.data:
-            field.data = ""
+        if getattr(field, 'multiple', False):
+            kwargs.setdefault('data-multiple', u'true')
         template = self.data_template
 
-        return HTMLString(template % {'text': html_params(type='text',
-                                      value=field.data,
-                                      **kwargs)
-                                      })
+        return HTMLString(template % {'text': _select2_ajax_params(field, kwargs)})
+
+
+class Select2AJAXPagedWidget(object):
+    """
+        Select2 that fetches choices paged from the server,
+        used by Select2Widget and Select2ManyWidget on lazy fields
+    """
+    data_template = ('<input %(text)s/>')
+
+    def __init__(self, multiple=False, style=None):
+        self.multiple = multiple
+        self.style = style or u'width:250px'
+
+    def __call__(self, field, **kwargs):
+        kwargs.setdefault('id', field.id)
+        kwargs.setdefault('name', field.name)
+        kwargs['class'] = u'my_select2_ajax_paged form-control'
+        kwargs['style'] = self.style
+        kwargs['endpoint'] = field.ajax_endpoint_func()
+        kwargs['data-placeholder'] = _('Select Value')
+        selection = [{'id': pk, 'text': text_type(label)} for pk, label, selected in field.iter_choices()
+                     if selected and pk != '__None']
+        kwargs['data-selection'] = json.dumps(selection)
+        if self.multiple:
+            kwargs['data-multiple'] = u'true'
+        return HTMLString(self.data_template % {'text': html_params(type='hidden',
+                                                                    value=','.join(item['id'] for item in selection),
+                                                                    **kwargs)
+                                                })
 
 
 class Select2Widget(widgets.Select):
@@ -153,6 +189,8 @@ class Select2Widget(widgets.Select):
         kwargs['data-placeholder'] = _('Select Value')
         if 'name_' in kwargs:
             field.name = kwargs['name_']
+        if getattr(field, 'is_lazy', None) and field.is_lazy():
+            return Select2AJAXPagedWidget(style=self.style)(field, **kwargs)
         return super(Select2Widget, self).__call__(field, **kwargs)
 
 
@@ -173,4 +211,7 @@ class Select2ManyWidget(widgets.Select):
         kwargs['multiple'] = u'true'
         if 'name_' in kwargs:
             field.name = kwargs['name_']
+        if getattr(field, 'is_lazy', None) and field.is_lazy():
+            del kwargs['multiple']
+            return Select2AJAXPagedWidget(multiple=True, style=self.style)(field, **kwargs)
         return super(Select2ManyWidget, self).__call__(field, **kwargs)
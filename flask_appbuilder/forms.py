@@ -92,6 +92,8 @@ class GeneralModelConverter(object):
 
     def __init__(self, datamodel):
         self.datamodel = datamodel
+        self.ajax_threshold = None
+        self.ajax_endpoint_func = None
 
     @staticmethod
     def _get_validators(col_name, validators_columns):
@@ -110,12 +112,28 @@ class GeneralModelConverter(object):
             if col_name in filter_rel_fields:
                 datamodel = self.datamodel.get_related_interface(col_name)
                 filters = datamodel.get_filters().add_filter_list(filter_rel_fields[col_name])
-                return lambda: datamodel.query(filters)[1]
-        return lambda: self.datamodel.get_related_interface(col_name).query()[1]
+                return lambda page_size=None: datamodel.query(filters, page_size=page_size,
+                                                              with_count=False)[1]
+        return lambda page_size=None: self.datamodel.get_related_interface(col_name).query(
+            page_size=page_size, with_count=False)[1]
+
+    def _get_related_get_many_func(self, col_name, filter_rel_fields):
+        datamodel = self.datamodel.get_related_interface(col_name)
+        filters = None
+        if filter_rel_fields and col_name in filter_rel_fields:
+            filters = datamodel.get_filters().add_filter_list(filter_rel_fields[col_name])
+        return lambda pks: datamodel.get_many(pks, filters)
 
     def _get_related_pk_func(self, col_name):
         return lambda obj: self.datamodel.get_related_interface(col_name).get_pk_value(obj)
 
+    def _get_ajax_args(self, col_name):
+        endpoint_func = self.ajax_endpoint_func
+        if not endpoint_func:
+            return {}
+        return {'ajax_threshold': self.ajax_threshold,
+                'ajax_endpoint_func': lambda: endpoint_func(col_name)}
+
     def _convert_many_to_one(self, col_name, label, description,
                              lst_validators, filter_rel_fields,
                              form_props):
@@ -126,6 +144,7 @@ class GeneralModelConverter(object):
         """
         query_func = self._get_related_query_func(col_name, filter_rel_fields)
         get_pk_func = self._get_related_pk_func(col_name)
+        get_many_func = self._get_related_get_many_func(col_name, filter_rel_fields)
         extra_classes = None
         allow_blank = True
         if not self.datamodel.is_nullable(col_name):
@@ -138,9 +157,11 @@ class GeneralModelConverter(object):
                              description=description,
                              query_func=query_func,
                              get_pk_func=get_pk_func,
+                             get_many_func=get_many_func,
                              allow_blank=allow_blank,
                              validators=lst_validators,
-                             widget=Select2Widget(extra_classes=extra_classes))
+                             widget=Select2Widget(extra_classes=extra_classes),
+                             **self._get_ajax_args(col_name))
         return form_props
 
     def _convert_many_to_many(self, col_name, label, description,
@@ -148,15 +169,18 @@ class GeneralModelConverter(object):
                               form_props):
         query_func = self._get_related_query_func(col_name, filter_rel_fields)
         get_pk_func = self._get_related_pk_func(col_name)
+        get_many_func = self._get_related_get_many_func(col_name, filter_rel_fields)
         allow_blank = True
         form_props[col_name] = \
             QuerySelectMultipleField(label,
                                      description=description,
                                      query_func=query_func,
                                     get_pk_func=get_pk_func,
+                                    get_many_func=get_many_func,
                                     allow_blank=allow_blank,
                                      validators=lst_validators,
-                                     widget=Select2ManyWidget())
+                                     widget=Select2ManyWidget(),
+                                     **self._get_ajax_args(col_name))
         return form_props
 
     def _convert_simple(self, col_name, label, description, lst_validators, form_props):
@@ -204,7 +228,8 @@ class GeneralModelConverter(object):
 
     def create_form(self, label_columns=None, inc_columns=None,
                     description_columns=None, validators_columns=None,
-                    extra_fields=None, filter_rel_fields=None):
+                    extra_fields=None, filter_rel_fields=None,
+                    ajax_threshold=None, ajax_endpoint_func=None):
         """
             Converts a model to a form given
 
@@ -228,7 +253,15 @@ class GeneralModelConverter(object):
 
             :param filter_rel_fields:
                 A filter to be applied on relationships
+            :param ajax_threshold:
+                Related fields with more rows than this are rendered
+                lazy, fetching their choices from ajax_endpoint_func
+            :param ajax_endpoint_func:
+                A function that returns the URL of the paged choices
+                endpoint for a related column name
         """
+        self.ajax_threshold = ajax_threshold
+        self.ajax_endpoint_func = ajax_endpoint_func
         label_columns = label_columns or {}
         inc_columns = inc_columns or []
         description_columns = description_columns or {}
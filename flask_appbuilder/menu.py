@@ -69,6 +69,18 @@ class Menu(object):
                     if ret_item:
                         return ret_item
 
+    def get_names(self, menu=None):
+        """
+            Returns a set with the names of all menu items,
+            including all nested childs.
+        """
+        names = set()
+        for item in menu or self.menu:
+            names.add(item.name)
+            if item.childs:
+                names.update(self.get_names(menu=item.childs))
+        return names
+
     def add_category(self, category, icon="", label="", parent_category=""):
         label = label or category
         if parent_category == "":
@@ -1,7 +1,10 @@
+import base64
 import datetime
+import json
 import logging
 from functools import reduce
 from flask_babel import lazy_gettext
+from .._compat import as_unicode
 from .filters import Filters
 
 try:
@@ -12,6 +15,25 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+CURSOR_DATE_FORMAT = '%Y-%m-%d'
+CURSOR_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def _cursor_encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.strftime(CURSOR_DATETIME_FORMAT)}
+    if isinstance(value, datetime.date):
+        return {'d': value.strftime(CURSOR_DATE_FORMAT)}
+    return str(value)
+
+
+def _cursor_decode_value(value):
+    if 'dt' in value:
+        return datetime.datetime.strptime(value['dt'], CURSOR_DATETIME_FORMAT)
+    if 'd' in value:
+        return datetime.datetime.strptime(value['d'], CURSOR_DATE_FORMAT).date()
+    return value
+
 
 class BaseInterface(object):
     """
@@ -141,9 +163,26 @@ class BaseInterface(object):
         Next methods must be overridden
     """
     def query(self, filters=None, order_column='', order_direction='',
-              page=None, page_size=None):
+              page=None, page_size=None, with_count=True, cursor=None,
+              select_columns=None):
         pass
 
+    def query_iter(self, filters=None, order_column='', order_direction='',
+                   select_columns=None, batch_size=1000):
+        """
+            Iterates over all the query results, override to
+            fetch them in batches on your backend
+        """
+        return iter(self.query(filters, order_column, order_direction,
+                               select_columns=select_columns)[1])
+
+    def query_aggregate(self, group_by, series, filters=None):
+        """
+            Override to group and aggregate on the backend,
+            returns None so that data is grouped in python.
+        """
+        return None
+
     def is_image(self, col_name):
         return False
 
@@ -237,12 +276,46 @@ class BaseInterface(object):
         """
         raise NotImplementedError
 
+    def add_all(self, items):
+        """
+            Adds a list of objects, by default one at a time
+        """
+        for item in items:
+            if not self.add(item):
+                return False
+        return True
+
+    def edit_all(self, items):
+        """
+            Edit (change) a list of objects, by default one at a time
+        """
+        for item in items:
+            if not self.edit(item):
+                return False
+        return True
+
+    def discard_changes(self, item):
+        """
+            Discards changes made to an object that were not saved,
+            so they are not persisted with other objects
+        """
+        pass
+
     def delete(self, item):
         """
             Deletes object
         """
         raise NotImplementedError
 
+    def delete_all(self, items):
+        """
+            Deletes a list of objects, by default one at a time
+        """
+        for item in items:
+            if not self.delete(item):
+                return False
+        return True
+
     def get_col_default(self, col_name):
         pass
 
@@ -262,6 +335,40 @@ class BaseInterface(object):
     def get_pk_value(self, item):
         return getattr(item, self.get_pk_name())
 
+    def encode_cursor(self, item, order_column=''):
+        """
+            Returns an opaque keyset pagination cursor pointing
+            after item, for the given order column.
+            Returns None if keyset pagination is not supported.
+        """
+        return None
+
+    def is_valid_cursor(self, cursor, order_column='', order_direction=''):
+        """
+            Returns True if the cursor can be used to query
+            on the given order
+        """
+        return False
+
+    def _encode_cursor(self, values):
+        values = json.dumps(values, default=_cursor_encode_value)
+        return base64.urlsafe_b64encode(values.encode('utf-8')).decode('ascii')
+
+    def _decode_cursor(self, cursor):
+        """
+            Returns the list of values encoded on the cursor,
+            None if the cursor is not valid
+        """
+        try:
+            values = base64.urlsafe_b64decode(str(cursor).encode('ascii')).decode('utf-8')
+            values = json.loads(values, object_hook=_cursor_decode_value)
+        except Exception as e:
+            log.warning("Invalid pagination cursor {0}: {1}".format(cursor, str(e)))
+            return None
+        if not isinstance(values, list):
+            return None
+        return values
+
     def get(self, pk, filter=None):
         """
             return the record from key, you can optionally pass filters
@@ -269,6 +376,23 @@ class BaseInterface(object):
         """
         pass
 
+    def get_many(self, pks, filters=None):
+        """
+            return the records from a list of keys, on the same order,
+            you can optionally pass filters, keys that do not exist
+            or are excluded by them are left out.
+            Override it to fetch all records in one go.
+        """
+        items = [self.get(pk, filters) for pk in pks]
+        return [item for item in items if item is not None]
+
+    def _order_by_pks(self, items, pks):
+        """
+            Orders items fetched in one go by the requested keys
+        """
+        items = dict((as_unicode(self.get_pk_value(item)), item) for item in items)
+        return [items[as_unicode(pk)] for pk in pks if as_unicode(pk) in items]
+
     def get_related_model(self, prop):
         raise NotImplementedError
 
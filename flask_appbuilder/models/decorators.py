@@ -1,4 +1,4 @@
-def renders(col_name):
+def renders(col_name, columns=None):
     """
         Use this decorator to map your custom Model properties to actual 
         Model db properties. As an example::
@@ -16,12 +16,21 @@ def renders(col_name):
             class MyModelView(ModelView):
                 datamodel = SQLAInterface(MyTable)
                 list_columns = ['name', 'my_custom']
-                            
+
+        If the method reads other columns, declare all of them with columns,
+        so that the columns not used on lists can be deferred::
+
+                @renders('custom', columns=['custom', 'name'])
+                def my_custom(self):
+                    return Markup('<b>' + self.name + ' ' + str(self.custom) + '</b>')
+
     """
 
     def wrap(f):
         if not hasattr(f, '_col_name'):
             f._col_name = col_name
+        if columns is not None and not hasattr(f, '_load_columns'):
+            f._load_columns = list(columns)
         return f
 
     return wrap
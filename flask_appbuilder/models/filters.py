@@ -124,7 +124,7 @@ class Filters(object):
         for col in cols:
             _filters = self.filter_converter(self.datamodel).convert(col)
             if _filters:
-                filters[col] = _filters
+                filters[col] = tuple(_filters)
         return filters
 
     def clear_filters(self):
@@ -152,11 +152,23 @@ class Filters(object):
             self._add_filter(filter_class(column_name, self.datamodel), value)
         return self
 
+    def empty_copy(self):
+        """
+            Returns a new object without active filters, that shares
+            this object's immutable search filters catalog
+
+            :return: A new Filters
+        """
+        retfilters = Filters(self.filter_converter, self.datamodel)
+        retfilters._search_filters = self._search_filters
+        retfilters._all_filters = self._all_filters
+        return retfilters
+
     def get_joined_filters(self, filters):
         """
             Creates a new filters class with active filters joined
         """
-        retfilters = Filters(self.filter_converter, self.datamodel)
+        retfilters = self.empty_copy()
         retfilters.filters = self.filters + filters.filters
         retfilters.values = self.values + filters.values
         return retfilters
@@ -167,7 +179,7 @@ class Filters(object):
 
             :return: A copy of self
         """
-        retfilters = Filters(self.filter_converter, self.datamodel)
+        retfilters = self.empty_copy()
         retfilters.filters = copy.copy(self.filters)
         retfilters.values = copy.copy(self.values)
         return retfilters
@@ -19,7 +19,9 @@ class GenericInterface(BaseInterface):
 
 
     def query(self, filters=None, order_column='', order_direction='',
-              page=None, page_size=None):
+              page=None, page_size=None, with_count=True, cursor=None,
+              select_columns=None):
+        # in memory sessions always know the exact count
 
         query = self.session.query(self.obj)
         if filters:
@@ -73,3 +75,9 @@ class GenericInterface(BaseInterface):
     def get(self, id, filters=None):
         # TODO: need to implement filters!
         return self.session.get(id)
+
+    def get_many(self, pks, filters=None):
+        query = self.session.query(self.obj)
+        if filters:
+            query = filters.apply_all(query)
+        return self._order_by_pks(query.all()[1], pks)
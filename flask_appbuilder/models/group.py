@@ -309,6 +309,14 @@ class GroupByProcessData(BaseProcessData):
         :sort: boolean, if true python will sort the data
         :return: A List of lists with group column and aggregation
     """
+    def format_rows(self, rows):
+        """
+            Formats rows already grouped and aggregated by the backend
+
+            :rows: A List of lists with group value and aggregations
+        """
+        return [[self.format_columns(row[0])] + list(row[1:]) for row in rows]
+
     def apply(self, data, sort=True):
         if sort:
             data = sorted(data, key=self.attrgetter(*self.group_bys_cols))
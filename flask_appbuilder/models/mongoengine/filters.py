@@ -5,7 +5,8 @@ from ..filters import BaseFilter, FilterRelation, BaseFilterConverter
 log = logging.getLogger(__name__)
 
 __all__ = ['MongoEngineFilterConverter', 'FilterEqual', 'FilterContains', 'FilterNotContains',
-           'FilterNotStartsWith', 'FilterStartsWith', 'FilterRelationOneToManyEqual', 'FilterRelationManyToManyEqual']
+           'FilterNotStartsWith', 'FilterStartsWith', 'FilterRelationOneToManyEqual', 'FilterRelationManyToManyEqual',
+           'FilterIContains']
 
 
 class FilterEqual(BaseFilter):
@@ -70,6 +71,13 @@ class FilterContains(BaseFilter):
         return query.filter(**flt)
 
 
+class FilterIContains(FilterContains):
+    """
+        case insensitive like, the same as FilterContains on MongoDB
+    """
+    name = lazy_gettext('Contains (insensitive)')
+
+
 class FilterNotContains(BaseFilter):
     name = lazy_gettext('Not Contains')
 
@@ -35,7 +35,8 @@ class MongoEngineInterface(BaseInterface):
         return self.obj.__name__
 
     def query(self, filters=None, order_column='', order_direction='',
-              page=None, page_size=None):
+              page=None, page_size=None, with_count=True, cursor=None,
+              select_columns=None):
 
         # base query : all objects
         objs = self.obj.objects
@@ -45,7 +46,7 @@ class MongoEngineInterface(BaseInterface):
             objs = filters.apply_all(objs)
 
         # get the count of all items, either filtered or unfiltered
-        count = objs.count()
+        count = objs.count() if with_count or page_size is None else None
 
         # order the data
         if order_column != '':
@@ -63,7 +64,11 @@ class MongoEngineInterface(BaseInterface):
                 log.warn('Retrieving %s %s items from DB' % (count, str(self.obj)))
         else: # get data segment for paginated page
             offset = (page or 0) * page_size
-            objs = objs[offset : offset + page_size]
+            if count is None:
+                # fetch one extra item to know if there is a next page
+                objs = objs[offset : offset + page_size + 1]
+            else:
+                objs = objs[offset : offset + page_size]
 
         return count, objs
 
@@ -282,3 +287,9 @@ class MongoEngineInterface(BaseInterface):
             return objs(pk=id).first()
 
         return self.obj.objects(pk=id).first()
+
+    def get_many(self, pks, filters=None):
+        objs = self.obj.objects
+        if filters:
+            objs = filters.apply_all(objs)
+        return self._order_by_pks(objs(pk__in=pks), pks)
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+import time
+import json
+import base64
+import decimal
+import datetime
+import logging
+import threading
+from collections import OrderedDict
+from itertools import chain
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import set_committed_value
+
+log = logging.getLogger(__name__)
+
+_query_caches = []
+""" Caches in use, all are invalidated when a session commits changes """
+
+CHANGED_TABLES_KEY = 'fab_changed_tables'
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H:%M:%S.%f'
+
+
+class BaseQueryCache(object):
+    """
+        Base class for SQLAInterface query caches.
+        Sub class to implement your own cache backend.
+
+        Results are stored under keys that include a version
+        for each table they depend on, so changing a table just
+        increments its version and all stale entries are never read again.
+    """
+    timeout = 300
+    """ Seconds a query result is kept on the cache """
+
+    def get(self, key):
+        """
+            Returns the cached JSON string for key or None
+        """
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """
+            Stores the JSON string value for key during timeout seconds
+        """
+        raise NotImplementedError
+
+    def get_table_versions(self, tables):
+        """
+            Returns a list with the current version of each table
+        """
+        raise NotImplementedError
+
+    def invalidate_tables(self, tables):
+        """
+            Increments the version of each table
+        """
+        raise NotImplementedError
+
+
+class SimpleQueryCache(BaseQueryCache):
+    """
+        In process LRU cache with expiration, safe to use between threads.
+        Changes are only noticed when committed by this process,
+        use RedisQueryCache if more processes write to the database.
+    """
+
+    def __init__(self, maxsize=1000, timeout=300):
+        """
+            :param maxsize:
+                Max number of query results kept, the least
+                recently used are dropped first
+            :param timeout:
+                Seconds a query result is kept
+        """
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._items = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.time():
+                return None
+            self._items[key] = item
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (time.time() + self.timeout, value)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def get_table_versions(self, tables):
+        with self._lock:
+            return [self._versions.get(table, 0) for table in tables]
+
+    def invalidate_tables(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RedisQueryCache(BaseQueryCache):
+    """
+        Cache stored on Redis, can be shared by many processes.
+        Accepts any client with redis-py get, set and incr methods.
+
+        Results are stored as JSON row values, never pickled, but anyone
+        that can write to Redis can still change the rows lists show.
+    """
+
+    def __init__(self, client, prefix='fab:query:', timeout=300):
+        """
+            :param client:
+                A Redis client, for example redis.StrictRedis()
+            :param prefix:
+                Prefix for all keys
+            :param timeout:
+                Seconds a query result is kept
+        """
+        self.client = client
+        self.prefix = prefix
+        self.timeout = timeout
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.timeout)
+
+    def get_table_versions(self, tables):
+        return [int(self.client.get(self.prefix + 'version:' + table) or 0)
+                for table in tables]
+
+    def invalidate_tables(self, tables):
+        for table in tables:
+            self.client.incr(self.prefix + 'version:' + table)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            raise TypeError(value)
+        return {'__datetime__': value.strftime(DATETIME_FORMAT)}
+    if isinstance(value, datetime.date):
+        return {'__date__': value.strftime(DATE_FORMAT)}
+    if isinstance(value, datetime.time):
+        if value.tzinfo is not None:
+            raise TypeError(value)
+        return {'__time__': value.strftime(TIME_FORMAT)}
+    if isinstance(value, decimal.Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(value)
+
+
+def _decode_value(value):
+    if len(value) == 1:
+        if '__datetime__' in value:
+            return datetime.datetime.strptime(value['__datetime__'], DATETIME_FORMAT)
+        if '__date__' in value:
+            return datetime.datetime.strptime(value['__date__'], DATE_FORMAT).date()
+        if '__time__' in value:
+            return datetime.datetime.strptime(value['__time__'], TIME_FORMAT).time()
+        if '__decimal__' in value:
+            return decimal.Decimal(value['__decimal__'])
+        if '__bytes__' in value:
+            return base64.b64decode(value['__bytes__'].encode('ascii'))
+    return value
+
+
+def _dump_item(item, mapper, path):
+    """
+        Returns the loaded column values and relations of item,
+        relations back to an item on the path are left to be lazy loaded
+    """
+    state = sa.inspect(item)
+    if state.mapper is not mapper:
+        # the class to rebuild is always taken from the mappers, never from the cache
+        raise TypeError(item)
+    path = path + (id(item),)
+    columns = dict((prop.key, state.dict[prop.key]) for prop in mapper.column_attrs
+                   if prop.key in state.dict)
+    relations = {}
+    for prop in mapper.relationships:
+        if prop.key not in state.dict:
+            continue
+        value = state.dict[prop.key]
+        if value is None:
+            relations[prop.key] = None
+        elif prop.uselist:
+            if any(id(related) in path for related in value):
+                continue
+            relations[prop.key] = [_dump_item(related, prop.mapper, path) for related in value]
+        elif id(value) not in path:
+            relations[prop.key] = _dump_item(value, prop.mapper, path)
+    return {'columns': columns, 'relations': relations}
+
+
+def _load_item(data, mapper):
+    """
+        Rebuilds a detached item from its values,
+        attributes that were not loaded are expired
+    """
+    item = mapper.class_manager.new_instance()
+    for key, value in data['columns'].items():
+        if key in mapper.column_attrs:
+            set_committed_value(item, key, value)
+    for key, value in data['relations'].items():
+        if key not in mapper.relationships:
+            continue
+        prop = mapper.relationships[key]
+        if value is not None:
+            if prop.uselist:
+                value = [_load_item(related, prop.mapper) for related in value]
+            else:
+                value = _load_item(value, prop.mapper)
+        set_committed_value(item, key, value)
+    sa.orm.make_transient_to_detached(item)
+    return item
+
+
+def dumps(result, mapper):
+    """
+        Returns a query result, a tuple with count and items, as JSON.
+        Raises TypeError for items with values JSON can't hold.
+    """
+    count, items = result
+    return json.dumps([count, [_dump_item(item, mapper, ()) for item in items]],
+                      default=_encode_value)
+
+
+def loads(value, mapper):
+    """
+        Returns the count and the detached items from a dumps JSON
+    """
+    count, items = json.loads(value, object_hook=_decode_value)
+    return count, [_load_item(item, mapper) for item in items]
+
+
+def get_mapper_tables(mapper):
+    return [table.name for table in mapper.tables]
+
+
+def mark_changed_tables(session, tables):
+    """
+        Tables changed by this session are invalidated on commit
+    """
+    session.info.setdefault(CHANGED_TABLES_KEY, set()).update(tables)
+
+
+def invalidate_tables(tables):
+    for cache in _query_caches:
+        try:
+            cache.invalidate_tables(tables)
+        except Exception as e:
+            log.exception("Query cache invalidate error: {0}".format(str(e)))
+
+
+def _after_flush(session, flush_context):
+    tables = set()
+    for item in chain(session.new, session.dirty, session.deleted):
+        mapper = sa.orm.object_mapper(item)
+        tables.update(get_mapper_tables(mapper))
+        # many to many collections are written on their secondary table
+        for prop in mapper.relationships:
+            if prop.secondary is not None:
+                tables.add(prop.secondary.name)
+    mark_changed_tables(session, tables)
+
+
+def _after_bulk_operation(context):
+    mark_changed_tables(context.session, get_mapper_tables(context.mapper))
+
+
+def _after_commit(session):
+    tables = session.info.pop(CHANGED_TABLES_KEY, None)
+    if tables:
+        invalidate_tables(tables)
+
+
+def _after_rollback(session):
+    session.info.pop(CHANGED_TABLES_KEY, None)
+
+
+def register_query_cache(cache):
+    """
+        Invalidates this cache on all committed changes,
+        session events are listened to after the first cache is registered.
+    """
+    if cache in _query_caches:
+        return
+    if not _query_caches:
+        event.listen(sa.orm.Session, 'after_flush', _after_flush)
+        event.listen(sa.orm.Session, 'after_bulk_delete', _after_bulk_operation)
+        event.listen(sa.orm.Session, 'after_bulk_update', _after_bulk_operation)
+        event.listen(sa.orm.Session, 'after_commit', _after_commit)
+        event.listen(sa.orm.Session, 'after_rollback', _after_rollback)
+    _query_caches.append(cache)
@@ -1,4 +1,5 @@
 import logging
+from sqlalchemy.orm import class_mapper
 from flask_babel import lazy_gettext
 from ..filters import BaseFilter, FilterRelation, BaseFilterConverter
 
@@ -8,39 +9,106 @@ log = logging.getLogger(__name__)
 __all__ = ['SQLAFilterConverter', 'FilterEqual', 'FilterNotStartsWith', 'FilterStartsWith', 'FilterContains',
            'FilterNotEqual', 'FilterEndsWith', 'FilterEqualFunction', 'FilterGreater', 'FilterNotEndsWith',
            'FilterRelationManyToManyEqual', 'FilterRelationOneToManyEqual', 'FilterRelationOneToManyNotEqual',
-           'FilterSmaller']
+           'FilterSmaller', 'FilterIContains']
+
+_field_setups = {}
+""" Resolved filter columns, { (model, column_name): (related mapper or None, field) } """
+_value_coercers = {}
+""" Value type conversion functions, { (interface class, model, column_name): function } """
+
+
+def clear_filter_caches():
+    """
+        Discards the resolved filter columns and value coercers,
+        called when mappers are configured again
+    """
+    _field_setups.clear()
+    _value_coercers.clear()
+
+
+def _get_field_setup(model, column_name):
+    key = (model, column_name)
+    field_setup = _field_setups.get(key)
+    if field_setup is None:
+        if not hasattr(model, column_name):
+            # it's an inner obj attr
+            rel_mapper = getattr(model, column_name.split('.')[0]).mapper
+            field_setup = (rel_mapper, getattr(rel_mapper.class_, column_name.split('.')[1]))
+        else:
+            field_setup = (None, getattr(model, column_name))
+        _field_setups[key] = field_setup
+    return field_setup
+
+
+def join_once(query, model):
+    """
+        Joins the query with model, unless it was already joined by join_once.
+        The joined models are kept on the query, and copied to the queries
+        derived from it, so nested queries don't see each other joins.
+    """
+    mapper = class_mapper(model)
+    joined = getattr(query, '_fab_joined_mappers', frozenset())
+    if mapper in joined:
+        return query
+    query = query.join(model)
+    query._fab_joined_mappers = joined | frozenset([mapper])
+    return query
+
 
 def get_field_setup_query(query, model, column_name):
     """
         Help function for SQLA filters, checks for dot notation on column names.
-        If it exists, will join the query with the model from the first part of the field name.
+        If it exists, will join the query with the model from the first part of the field name,
+        only once for all filters on the same query.
 
         example:
             Contact.created_by: if created_by is a User model, it will be joined to the query.
     """
-    if not hasattr(model, column_name):
-       # it's an inner obj attr
-        rel_model = getattr(model, column_name.split('.')[0]).mapper.class_
-        query = query.join(rel_model)
-        return query, getattr(rel_model, column_name.split('.')[1])
-    else:
-        return query, getattr(model, column_name)
+    rel_mapper, field = _get_field_setup(model, column_name)
+    if rel_mapper is not None:
+        query = join_once(query, rel_mapper.class_)
+    return query, field
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except Exception as e:
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except Exception as e:
+        return None
+
+
+def _to_boolean(value):
+    if value == 'y':
+        return True
+    return value
+
+
+def _get_value_coercer(datamodel, column_name):
+    key = (datamodel.__class__, datamodel.obj, column_name)
+    if key not in _value_coercers:
+        if datamodel.is_integer(column_name):
+            coercer = _to_int
+        elif datamodel.is_float(column_name):
+            coercer = _to_float
+        elif datamodel.is_boolean(column_name):
+            coercer = _to_boolean
+        else:
+            coercer = None
+        _value_coercers[key] = coercer
+    return _value_coercers[key]
 
 
 def set_value_to_type(datamodel, column_name, value):
-    if datamodel.is_integer(column_name):
-        try:
-            return int(value)
-        except Exception as e:
-            return None
-    elif datamodel.is_float(column_name):
-        try:
-            return float(value)
-        except Exception as e:
-            return None
-    elif datamodel.is_boolean(column_name):
-            if value == 'y':
-                return True
+    coercer = _get_value_coercer(datamodel, column_name)
+    if coercer:
+        return coercer(value)
     return value
 
 
@@ -84,6 +152,17 @@ class FilterContains(BaseFilter):
         return query.filter(field.like('%' + value + '%'))
 
 
+class FilterIContains(BaseFilter):
+    """
+        case insensitive like
+    """
+    name = lazy_gettext('Contains (insensitive)')
+
+    def apply(self, query, value):
+        query, field = get_field_setup_query(query, self.model, self.column_name)
+        return query.filter(field.ilike('%' + value + '%'))
+
+
 class FilterNotContains(BaseFilter):
     name = lazy_gettext('Not Contains')
 
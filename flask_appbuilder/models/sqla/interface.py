@@ -1,21 +1,28 @@
 # -*- coding: utf-8 -*-
 import sys
+import decimal
+import datetime
+import hashlib
 import logging
 import sqlalchemy as sa
 
 from . import filters
-from sqlalchemy.orm import joinedload
+from .filters import join_once
+from .cache import register_query_cache, mark_changed_tables, get_mapper_tables, dumps, loads
+from sqlalchemy.orm import joinedload, subqueryload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
+from sqlalchemy import func, event
 from sqlalchemy.orm.properties import SynonymProperty
 
 from ..base import BaseInterface
-from ..group import GroupByDateYear, GroupByDateMonth, GroupByCol
+from ..group import GroupByDateYear, GroupByDateMonth, GroupByCol, \
+    aggregate_count, aggregate_sum, aggregate_avg
 from ..mixins import FileColumn, ImageColumn
 from ...filemanager import FileManager, ImageManager
-from ..._compat import as_unicode
+from ..._compat import as_unicode, string_types, integer_types
 from ...const import LOGMSG_ERR_DBI_ADD_GENERIC, LOGMSG_ERR_DBI_EDIT_GENERIC, LOGMSG_ERR_DBI_DEL_GENERIC, \
-    LOGMSG_WAR_DBI_ADD_INTEGRITY, LOGMSG_WAR_DBI_EDIT_INTEGRITY, LOGMSG_WAR_DBI_DEL_INTEGRITY
+    LOGMSG_WAR_DBI_ADD_INTEGRITY, LOGMSG_WAR_DBI_EDIT_INTEGRITY, LOGMSG_WAR_DBI_DEL_INTEGRITY, \
+    LOGMSG_WAR_DBI_QUERY_CACHE
 
 log = logging.getLogger(__name__)
 
@@ -26,30 +33,115 @@ def _include_filters(obj):
             setattr(obj, key, getattr(filters, key))
 
 
+_interface_metadata = {}
+""" Model metadata shared by interfaces, { (interface class, model): (columns, properties, types) } """
+
+
+@event.listens_for(sa.orm.mapper, 'after_configured')
+def _clear_interface_metadata():
+    # new mappers can add properties, backrefs for example, to already collected models
+    _interface_metadata.clear()
+    filters.clear_filter_caches()
+
+
 class SQLAInterface(BaseInterface):
     """
     SQLAModel
     Implements SQLA support methods for views
     """
     session = None
+    bulk_chunk_size = 500
+    """ Max number of keys sent on each IN clause by get_many and delete_all """
+    query_cache = None
+    """
+        A BaseQueryCache instance to cache query results,
+        results are invalidated when their tables change
+    """
+
+    column_type_classes = (('image', ImageColumn),
+                           ('file', FileColumn),
+                           ('string', sa.types.String),
+                           ('text', sa.types.Text),
+                           ('integer', sa.types.Integer),
+                           ('numeric', sa.types.Numeric),
+                           ('float', sa.types.Float),
+                           ('boolean', sa.types.Boolean),
+                           ('date', sa.types.Date),
+                           ('datetime', sa.types.DateTime),
+                           ('enum', sa.types.Enum))
+    """ Column type names answered by each is_<type> method, and their SQLA types """
+    relation_directions = {'MANYTOONE': 'relation_many_to_one',
+                           'MANYTOMANY': 'relation_many_to_many',
+                           'ONETOMANY': 'relation_one_to_many'}
 
     filter_converter_class = filters.SQLAFilterConverter
 
-    def __init__(self, obj, session=None):
+    def __init__(self, obj, session=None, query_cache=None):
         _include_filters(self)
-        self.list_columns = dict()
-        self.list_properties = dict()
-
         self.session = session
-        # Collect all SQLA columns and properties
-        for prop in sa.orm.class_mapper(obj).iterate_properties:
-            if type(prop) != SynonymProperty:
-                self.list_properties[prop.key] = prop
-        for col_name in obj.__mapper__.columns.keys():
-            if col_name in self.list_properties:
-                self.list_columns[col_name] = obj.__mapper__.columns[col_name]
+        if query_cache is not None:
+            self.query_cache = query_cache
+        if self.query_cache is not None:
+            register_query_cache(self.query_cache)
+        self._cache_tables = None
+        self.list_columns, self.list_properties, self._column_types = self._get_metadata(obj)
         super(SQLAInterface, self).__init__(obj)
 
+    def _get_metadata(self, obj):
+        """
+            Returns the model columns, properties and column types,
+            collected once and shared by all interfaces of the same class and model,
+            never change them
+        """
+        # configures new mappers first, that clears the metadata of changed models
+        mapper = sa.orm.class_mapper(obj)
+        key = (self.__class__, obj)
+        metadata = _interface_metadata.get(key)
+        if metadata is None:
+            list_properties = dict()
+            list_columns = dict()
+            # Collect all SQLA columns and properties
+            for prop in mapper.iterate_properties:
+                if type(prop) != SynonymProperty:
+                    list_properties[prop.key] = prop
+            for col_name in mapper.columns.keys():
+                if col_name in list_properties:
+                    list_columns[col_name] = mapper.columns[col_name]
+            metadata = (list_columns, list_properties,
+                        self._init_column_types(list_columns, list_properties))
+            _interface_metadata[key] = metadata
+        return metadata
+
+    def _init_column_types(self, list_columns, list_properties):
+        """
+            Computes the types of each column and relation once,
+            all is_<type> methods are answered from it
+        """
+        column_types_dict = dict()
+        for col_name, column in list_columns.items():
+            column_types = set(type_name for type_name, type_class in self.column_type_classes
+                               if isinstance(column.type, type_class))
+            if column.nullable:
+                column_types.add('nullable')
+            if column.unique:
+                column_types.add('unique')
+            if column.primary_key:
+                column_types.add('pk')
+            if column.foreign_keys:
+                column_types.add('fk')
+            column_types_dict[col_name] = frozenset(column_types)
+        for col_name, prop in list_properties.items():
+            if isinstance(prop, sa.orm.properties.RelationshipProperty):
+                column_types = set(['relation'])
+                relation_type = self.relation_directions.get(prop.direction.name)
+                if relation_type:
+                    column_types.add(relation_type)
+                if relation_type == 'relation_many_to_one' and \
+                        list(prop.local_columns)[0].nullable:
+                    column_types.add('nullable')
+                column_types_dict[col_name] = frozenset(column_types)
+        return column_types_dict
+
     @property
     def model_name(self):
         """
@@ -74,7 +166,8 @@ class SQLAInterface(BaseInterface):
         return query
 
     def query(self, filters=None, order_column='', order_direction='',
-              page=None, page_size=None):
+              page=None, page_size=None, with_count=True, cursor=None,
+              select_columns=None):
         """
             QUERY
             :param filters:
@@ -87,55 +180,396 @@ class SQLAInterface(BaseInterface):
                 the current page
             :param page_size:
                 the current page size
+            :param with_count:
+                If False the count query is skipped and None is returned
+                as count, one extra row is fetched so that the caller
+                can tell if there is a next page.
+            :param cursor:
+                keyset pagination cursor returned by encode_cursor,
+                if valid it's used instead of the page offset
+            :param select_columns:
+                list of columns that will be rendered, relations and dotted
+                columns on this list are eager loaded, all other columns
+                not needed to render them are deferred
+
+        """
+        cache_key = None
+        if self.query_cache is not None:
+            cache_key = self._get_query_cache_key(filters, order_column, order_direction,
+                                                  page, page_size, with_count, cursor,
+                                                  select_columns)
+            result = self._get_query_cache(cache_key)
+            if result is not None:
+                return result
+        result = self._query(filters=filters, order_column=order_column,
+                             order_direction=order_direction, page=page,
+                             page_size=page_size, with_count=with_count,
+                             cursor=cursor, select_columns=select_columns)
+        if cache_key is not None:
+            self._set_query_cache(cache_key, result)
+        return result
+
+    def _query(self, filters=None, order_column='', order_direction='',
+               page=None, page_size=None, with_count=True, cursor=None,
+               select_columns=None):
+        keyset = None
+        if cursor:
+            keyset = self._get_keyset_filter(cursor, order_column, order_direction)
+        query = self._get_select_query(filters=filters,
+                                       order_column=order_column,
+                                       order_direction=order_direction,
+                                       select_columns=select_columns)
+        if page_size:
+            # order by primary key also, so that pages are deterministic
+            pk = self._get_attr(self.get_pk_name())
+            if order_column and order_direction != 'asc':
+                query = query.order_by(pk.desc())
+            else:
+                query = query.order_by(pk.asc())
+        if keyset is not None:
+            query = query.filter(keyset)
+        elif page:
+            query = query.offset(page * page_size)
+
+        if not with_count:
+            if page_size:
+                return None, query.limit(page_size + 1).all()
+            result = query.all()
+            return len(result), result
+
+        query_count = self.session.query(func.count('*')).select_from(self.obj)
+        query_count = self._get_base_query(query=query_count,
+                                           filters=filters)
+        count = query_count.scalar()
 
+        if page_size:
+            query = query.limit(page_size)
+
+        return count, query.all()
+
+    def _get_cache_tables(self):
+        """
+            Tables that change the results of this model queries,
+            its own and the ones of its relations
         """
+        if self._cache_tables is None:
+            mapper = sa.orm.class_mapper(self.obj)
+            tables = set(get_mapper_tables(mapper))
+            for prop in mapper.relationships:
+                tables.update(get_mapper_tables(prop.mapper))
+                if prop.secondary is not None:
+                    tables.add(prop.secondary.name)
+            self._cache_tables = sorted(tables)
+        return self._cache_tables
+
+    def _get_query_cache_value(self, value):
+        if callable(value):
+            value = value()
+        state = sa.inspect(value, raiseerr=False)
+        if isinstance(state, sa.orm.state.InstanceState):
+            return repr(state.identity_key)
+        if isinstance(value, (list, tuple)):
+            return repr([self._get_query_cache_value(item) for item in value])
+        return as_unicode(value)
+
+    def _get_query_cache_key(self, filters, order_column, order_direction,
+                             page, page_size, with_count, cursor, select_columns):
+        tables = self._get_cache_tables()
+        try:
+            versions = self.query_cache.get_table_versions(tables)
+        except Exception as e:
+            log.warning(LOGMSG_WAR_DBI_QUERY_CACHE.format(str(e)))
+            return None
+        filter_keys = []
+        if filters:
+            for flt, value in zip(filters.filters, filters.values):
+                filter_keys.append((flt.column_name, flt.__class__.__name__,
+                                    flt.is_related_view,
+                                    self._get_query_cache_value(value)))
+        key = repr((self.obj.__module__, self.obj.__name__, list(zip(tables, versions)),
+                    filter_keys, order_column, order_direction, page, page_size,
+                    with_count, cursor, list(select_columns or [])))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _get_query_cache(self, cache_key):
+        try:
+            value = self.query_cache.get(cache_key)
+            if value is None:
+                return None
+            count, items = loads(value, sa.orm.class_mapper(self.obj))
+        except Exception as e:
+            log.warning(LOGMSG_WAR_DBI_QUERY_CACHE.format(str(e)))
+            return None
+        # cached items are attached to the session without loading them again
+        return count, [self.session.merge(item, load=False) for item in items]
+
+    def _set_query_cache(self, cache_key, result):
+        count, items = result
+        try:
+            self.query_cache.set(cache_key, dumps((count, list(items)), sa.orm.class_mapper(self.obj)))
+        except Exception as e:
+            log.warning(LOGMSG_WAR_DBI_QUERY_CACHE.format(str(e)))
+
+    def _get_select_query(self, filters=None, order_column='', order_direction='',
+                          select_columns=None, collections=True):
         query = self.session.query(self.obj)
+        if select_columns:
+            query = query.options(*self._get_eager_loads(select_columns, collections=collections))
+            load_only_columns = self._get_load_only_columns(select_columns, order_column)
+            if load_only_columns:
+                query = query.options(sa.orm.load_only(*load_only_columns))
         if len(order_column.split('.')) >= 2:
             tmp_order_column = ''
             for join_relation in order_column.split('.')[:-1]:
                 model_relation = self.get_related_model(join_relation)
-                query = query.join(model_relation)
+                # filters on the same relation won't join it again
+                query = join_once(query, model_relation)
                 # redefine order column name, because relationship can have a different name
                 # from the related table name.
                 tmp_order_column = tmp_order_column + model_relation.__tablename__ + '.'
             order_column = tmp_order_column + order_column.split('.')[-1]
-        query_count = self.session.query(func.count('*')).select_from(self.obj)
+        return self._get_base_query(query=query,
+                                    filters=filters,
+                                    order_column=order_column,
+                                    order_direction=order_direction)
 
-        query_count = self._get_base_query(query=query_count,
-                                           filters=filters)
-        query = self._get_base_query(query=query,
-                                     filters=filters,
-                                     order_column=order_column,
-                                     order_direction=order_direction)
+    def query_iter(self, filters=None, order_column='', order_direction='',
+                   select_columns=None, batch_size=1000):
+        """
+            Iterates over all the query results without loading them all in memory,
+            rows are fetched in batches of batch_size using server side cursors
+            when the database driver supports them.
+            Collections on select_columns are not eager loaded.
+        """
+        query = self._get_select_query(filters=filters,
+                                       order_column=order_column,
+                                       order_direction=order_direction,
+                                       select_columns=select_columns,
+                                       collections=False)
+        return query.execution_options(stream_results=True).yield_per(batch_size)
+
+    def _get_eager_loads(self, columns, collections=True):
+        """
+            Returns the loader options for all relations on columns,
+            including nested dotted paths. Many to one relations are
+            joined, collections are loaded with a separate query,
+            or not eager loaded at all if collections is False.
+        """
+        options = []
+        paths = set()
+        for column in columns:
+            model, load, path = self.obj, None, ()
+            for name in column.split('.'):
+                relation = sa.orm.class_mapper(model).relationships.get(name)
+                if relation is None or (relation.uselist and not collections):
+                    break
+                loader = subqueryload if relation.uselist else joinedload
+                if load is None:
+                    load = loader(getattr(model, name))
+                else:
+                    load = getattr(load, loader.__name__)(getattr(model, name))
+                path = path + (name,)
+                model = relation.mapper.class_
+            if load is not None and path not in paths:
+                paths.add(path)
+                options.append(load)
+        return options
+
+    def _get_load_only_columns(self, columns, order_column=''):
+        """
+            Returns the names of the model columns needed to render columns.
+            Keeps the primary key, the order column, foreign keys of relations
+            and columns declared by **renders('<COL_NAME>', columns=[...])**.
+            Returns None if some column is a method or property that doesn't
+            declare the columns it reads, so nothing can be deferred.
+        """
+        mapper = sa.orm.class_mapper(self.obj)
+        names = set(mapper.get_property_by_column(col).key for col in mapper.primary_key)
+        if order_column in self.list_columns:
+            names.add(order_column)
+        for column in columns:
+            if not isinstance(column, string_types):
+                return None
+            name = column.split('.')[0]
+            if name in self.list_columns:
+                names.add(name)
+            elif name in mapper.relationships:
+                for col in mapper.relationships[name].local_columns:
+                    names.add(mapper.get_property_by_column(col).key)
+            else:
+                col_names = getattr(getattr(self.obj, name, None), '_load_columns', None)
+                if not col_names or not all(col_name in self.list_columns for col_name in col_names):
+                    return None
+                names.update(col_names)
+        return sorted(names)
 
-        count = query_count.scalar()
+    def _is_keyset_column(self, col_name):
+        """
+            Returns True if rows can be sought by the column value,
+            NULLs have no order in common between databases so nullable columns are refused
+        """
+        return col_name in self.list_columns and not self.is_nullable(col_name) and \
+            self._get_keyset_type(col_name) is not None
 
-        if page:
-            query = query.offset(page * page_size)
-        if page_size:
-            query = query.limit(page_size)
+    def _get_keyset_type(self, col_name):
+        """
+            Returns the python types accepted for the column value on a cursor,
+            None if the column can't be used on cursors
+        """
+        if self.is_enum(col_name):
+            return None
+        if self.is_boolean(col_name):
+            return bool
+        if self.is_integer(col_name):
+            return integer_types
+        if self.is_float(col_name):
+            return integer_types + (float,)
+        if self.is_numeric(col_name):
+            return decimal.Decimal
+        if self.is_datetime(col_name):
+            return datetime.datetime
+        if self.is_date(col_name):
+            return datetime.date
+        if self.is_string(col_name) or self.is_text(col_name):
+            return string_types
+        return None
+
+    def _get_keyset_value(self, col_name, value):
+        """
+            Returns the cursor value checked against the column type,
+            raises ValueError if it doesn't match
+        """
+        keyset_type = self._get_keyset_type(col_name)
+        if keyset_type is decimal.Decimal and isinstance(value, string_types):
+            try:
+                return decimal.Decimal(value)
+            except decimal.InvalidOperation:
+                raise ValueError(value)
+        if not isinstance(value, keyset_type) or \
+                (isinstance(value, bool) and keyset_type is not bool) or \
+                (isinstance(value, datetime.datetime) and keyset_type is datetime.date):
+            raise ValueError(value)
+        return value
+
+    def encode_cursor(self, item, order_column=''):
+        pk_name = self.get_pk_name()
+        if not self._is_keyset_column(pk_name) or \
+                (order_column and not self._is_keyset_column(order_column)):
+            return None
+        values = [self.get_pk_value(item)]
+        if order_column:
+            values.insert(0, getattr(item, order_column))
+        return self._encode_cursor(values)
+
+    def is_valid_cursor(self, cursor, order_column='', order_direction=''):
+        return self._get_keyset_filter(cursor, order_column, order_direction) is not None
+
+    def _get_keyset_filter(self, cursor, order_column='', order_direction=''):
+        """
+            Returns the keyset predicate for the cursor, rows after
+            (order column value, pk) on the current order.
+            Returns None if the cursor is not valid for this order.
+        """
+        values = self._decode_cursor(cursor)
+        col_names = [order_column] if order_column else []
+        col_names.append(self.get_pk_name())
+        if not values or len(values) != len(col_names) or \
+                not all(self._is_keyset_column(col_name) for col_name in col_names):
+            return None
+        try:
+            values = [self._get_keyset_value(col_name, value)
+                      for col_name, value in zip(col_names, values)]
+        except ValueError:
+            log.warning("Invalid pagination cursor {0}".format(cursor))
+            return None
+        pk = self._get_attr(self.get_pk_name())
+        if not order_column:
+            return pk > values[0]
+        col = self._get_attr(order_column)
+        value, pk_value = values
+        if order_direction == 'asc':
+            return sa.or_(col > value, sa.and_(col == value, pk > pk_value))
+        return sa.or_(col < value, sa.and_(col == value, pk < pk_value))
+
+    def _get_aggregate_column(self, aggregate_func, col_name):
+        """
+            Returns the SQL expression for the builtin aggregate functions,
+            None if the aggregation can't be made by the database
+        """
+        if aggregate_func is aggregate_count:
+            return func.count()
+        if col_name not in self.list_columns:
+            return None
+        if aggregate_func is aggregate_sum:
+            return func.sum(self._get_attr(col_name))
+        if aggregate_func is aggregate_avg:
+            return sa.cast(func.avg(self._get_attr(col_name)), sa.Float)
+        return None
+
+    def _get_group_query(self, group_columns, aggregate_columns, filters=None, criterion=None):
+        query = self.session.query(*(group_columns + aggregate_columns)).select_from(self.obj)
+        query = self._get_base_query(query=query, filters=filters)
+        if criterion is not None:
+            query = query.filter(criterion)
+        return query.group_by(*group_columns).order_by(*group_columns)
 
-        return count, query.all()
+    def query_aggregate(self, group_by, series, filters=None):
+        """
+            Groups and aggregates on the database with a single GROUP BY query
+
+            :param group_by: the column name to group by
+            :param series: list of tuples with the aggregate function and the column name
+            :param filters: Filters class
+            :return: list of lists with the group value and the aggregated values,
+                ordered by group, or None if some aggregate is a custom function
+        """
+        if group_by not in self.list_columns:
+            return None
+        aggregate_columns = []
+        for serie in series:
+            if not isinstance(serie, tuple):
+                return None
+            aggregate_column = self._get_aggregate_column(serie[0], serie[1])
+            if aggregate_column is None:
+                return None
+            aggregate_columns.append(aggregate_column)
+        query = self._get_group_query([self._get_attr(group_by)], aggregate_columns, filters=filters)
+        return [list(row) for row in query]
 
     def query_simple_group(self, group_by='', aggregate_func=None, aggregate_col=None, filters=None):
+        group = GroupByCol(group_by, 'Group by', aggregate_func or aggregate_count, aggregate_col or '')
+        aggregate_column = self._get_aggregate_column(group.aggregate_func, group.aggregate_col)
+        if group_by in self.list_columns and aggregate_column is not None:
+            query = self._get_group_query([self._get_attr(group_by)], [aggregate_column], filters=filters)
+            return [[group.get_format_group_col(value), aggregate] for value, aggregate in query]
         query = self.session.query(self.obj)
         query = self._get_base_query(query=query, filters=filters)
         query_result = query.all()
-        group = GroupByCol(group_by, 'Group by')
         return group.apply(query_result)
 
     def query_month_group(self, group_by='', filters=None):
+        group = GroupByDateMonth(group_by, 'Group by Month')
+        if group_by in self.list_columns:
+            col = self._get_attr(group_by)
+            year = sa.cast(sa.extract('year', col), sa.Integer)
+            month = sa.cast(sa.extract('month', col), sa.Integer)
+            query = self._get_group_query([year, month], [func.count()], filters=filters,
+                                          criterion=col.isnot(None))
+            return [[group.get_format_group_col((year, month)), count] for year, month, count in query]
         query = self.session.query(self.obj)
         query = self._get_base_query(query=query, filters=filters)
         query_result = query.all()
-        group = GroupByDateMonth(group_by, 'Group by Month')
         return group.apply(query_result)
 
     def query_year_group(self, group_by='', filters=None):
+        group_year = GroupByDateYear(group_by, 'Group by Year')
+        if group_by in self.list_columns:
+            year = sa.cast(sa.extract('year', self._get_attr(group_by)), sa.Integer)
+            query = self._get_group_query([year], [func.count()], filters=filters)
+            return [[group_year.get_format_group_col(year), count] for year, count in query]
         query = self.session.query(self.obj)
         query = self._get_base_query(query=query, filters=filters)
         query_result = query.all()
-        group_year = GroupByDateYear(group_by, 'Group by Year')
         return group_year.apply(query_result)
 
     """
@@ -144,132 +578,68 @@ class SQLAInterface(BaseInterface):
     -----------------------------------------
     """
 
+    def _get_column_types(self, col_name):
+        return self._column_types.get(col_name, ())
+
     def is_image(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, ImageColumn)
-        except:
-            return False
+        return 'image' in self._get_column_types(col_name)
 
     def is_file(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, FileColumn)
-        except:
-            return False
+        return 'file' in self._get_column_types(col_name)
 
     def is_string(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.String)
-        except:
-            return False
+        return 'string' in self._get_column_types(col_name)
 
     def is_text(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.Text)
-        except:
-            return False
+        return 'text' in self._get_column_types(col_name)
 
     def is_integer(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.Integer)
-        except:
-            return False
+        return 'integer' in self._get_column_types(col_name)
 
     def is_numeric(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.Numeric)
-        except:
-            return False
+        return 'numeric' in self._get_column_types(col_name)
 
     def is_float(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.Float)
-        except:
-            return False
+        return 'float' in self._get_column_types(col_name)
 
     def is_boolean(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.Boolean)
-        except:
-            return False
+        return 'boolean' in self._get_column_types(col_name)
 
     def is_date(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.Date)
-        except:
-            return False
+        return 'date' in self._get_column_types(col_name)
 
     def is_datetime(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.DateTime)
-        except:
-            return False
+        return 'datetime' in self._get_column_types(col_name)
 
     def is_enum(self, col_name):
-        try:
-            return isinstance(self.list_columns[col_name].type, sa.types.Enum)
-        except:
-            return False
+        return 'enum' in self._get_column_types(col_name)
 
     def is_relation(self, col_name):
-        try:
-            return isinstance(self.list_properties[col_name], sa.orm.properties.RelationshipProperty)
-        except:
-            return False
+        return 'relation' in self._get_column_types(col_name)
 
     def is_relation_many_to_one(self, col_name):
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == 'MANYTOONE'
-        except:
-            return False
+        return 'relation_many_to_one' in self._get_column_types(col_name)
 
     def is_relation_many_to_many(self, col_name):
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == 'MANYTOMANY'
-        except:
-            return False
+        return 'relation_many_to_many' in self._get_column_types(col_name)
 
     def is_relation_one_to_one(self, col_name):
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == 'ONETOONE'
-        except:
-            return False
+        return 'relation_one_to_one' in self._get_column_types(col_name)
 
     def is_relation_one_to_many(self, col_name):
-        try:
-            if self.is_relation(col_name):
-                return self.list_properties[col_name].direction.name == 'ONETOMANY'
-        except:
-            return False
+        return 'relation_one_to_many' in self._get_column_types(col_name)
 
     def is_nullable(self, col_name):
-        if self.is_relation_many_to_one(col_name):
-            col = self.get_relation_fk(col_name)
-            return col.nullable
-        try:
-            return self.list_columns[col_name].nullable
-        except:
-            return False
+        return 'nullable' in self._get_column_types(col_name)
 
     def is_unique(self, col_name):
-        try:
-            return self.list_columns[col_name].unique
-        except:
-            return False
+        return 'unique' in self._get_column_types(col_name)
 
     def is_pk(self, col_name):
-        try:
-            return self.list_columns[col_name].primary_key
-        except:
-            return False
+        return 'pk' in self._get_column_types(col_name)
 
     def is_fk(self, col_name):
-        try:
-            return self.list_columns[col_name].foreign_keys
-        except:
-            return False
+        return 'fk' in self._get_column_types(col_name)
 
     def get_max_length(self, col_name):
         try:
@@ -323,6 +693,53 @@ class SQLAInterface(BaseInterface):
             self.session.rollback()
             return False
 
+    def add_all(self, items):
+        try:
+            if self._is_bulk_savable():
+                for item in items:
+                    self._set_relation_fks(item)
+                # return_defaults fetches the new primary keys into the items
+                self.session.bulk_save_objects(items, return_defaults=True)
+                # bulk saves skip the flush events that invalidate the query cache
+                mark_changed_tables(self.session, get_mapper_tables(sa.orm.class_mapper(self.obj)))
+            else:
+                self.session.add_all(items)
+            self.session.commit()
+            self.message = (as_unicode(self.add_row_message), 'success')
+            return True
+        except IntegrityError as e:
+            self.message = (as_unicode(self.add_integrity_error_message), 'warning')
+            log.warning(LOGMSG_WAR_DBI_ADD_INTEGRITY.format(str(e)))
+            self.session.rollback()
+            return False
+        except Exception as e:
+            self.message = (as_unicode(self.general_error_message + ' ' + str(sys.exc_info()[0])), 'danger')
+            log.exception(LOGMSG_ERR_DBI_ADD_GENERIC.format(str(e)))
+            self.session.rollback()
+            return False
+
+    def edit_all(self, items):
+        try:
+            # one flush, rows changing the same columns are sent with executemany
+            self.session.add_all(items)
+            self.session.commit()
+            self.message = (as_unicode(self.edit_row_message), 'success')
+            return True
+        except IntegrityError as e:
+            self.message = (as_unicode(self.edit_integrity_error_message), 'warning')
+            log.warning(LOGMSG_WAR_DBI_EDIT_INTEGRITY.format(str(e)))
+            self.session.rollback()
+            return False
+        except Exception as e:
+            self.message = (as_unicode(self.general_error_message + ' ' + str(sys.exc_info()[0])), 'danger')
+            log.exception(LOGMSG_ERR_DBI_EDIT_GENERIC.format(str(e)))
+            self.session.rollback()
+            return False
+
+    def discard_changes(self, item):
+        if item in self.session:
+            self.session.expire(item)
+
     def delete(self, item):
         try:
             self._delete_files(item)
@@ -343,9 +760,21 @@ class SQLAInterface(BaseInterface):
 
     def delete_all(self, items):
         try:
-            for item in items:
-                self._delete_files(item)
-                self.session.delete(item)
+            self._delete_all_files(items)
+            if self._is_bulk_deletable():
+                pk = self._get_attr(self.get_pk_name())
+                pks = [self.get_pk_value(item) for item in items]
+                for i in range(0, len(pks), self.bulk_chunk_size):
+                    self.session.query(self.obj).filter(
+                        pk.in_(pks[i:i + self.bulk_chunk_size])
+                    ).delete(synchronize_session=False)
+                # keep the deleted items usable for post_delete hooks
+                for item in items:
+                    if item in self.session:
+                        self.session.expunge(item)
+            else:
+                for item in items:
+                    self.session.delete(item)
             self.session.commit()
             self.message = (as_unicode(self.delete_row_message), 'success')
             return True
@@ -376,6 +805,67 @@ class SQLAInterface(BaseInterface):
             if self.is_image(file_col):
                 im.save_file(this_request.files[file_col], getattr(item, file_col))
 
+    def _is_bulk_deletable(self):
+        """
+            Returns True if rows can be deleted with a single DELETE
+            statement, the ORM has no cascades, association rows or
+            inherited tables to take care of.
+        """
+        mapper = sa.orm.class_mapper(self.obj)
+        if mapper.inherits is not None or mapper.polymorphic_on is not None:
+            return False
+        for relation in mapper.relationships:
+            if relation.direction != sa.orm.interfaces.MANYTOONE or \
+                    relation.cascade.delete:
+                return False
+        return True
+
+    def _is_bulk_savable(self):
+        """
+            Returns True if new rows can be inserted with bulk_save_objects,
+            the model only has many to one relations
+            and no inherited tables.
+        """
+        mapper = sa.orm.class_mapper(self.obj)
+        if mapper.inherits is not None or mapper.polymorphic_on is not None:
+            return False
+        for relation in mapper.relationships:
+            if relation.direction != sa.orm.interfaces.MANYTOONE:
+                return False
+        return True
+
+    def _set_relation_fks(self, item):
+        """
+            Copies the keys of many to one related objects to the
+            foreign key columns, bulk_save_objects ignores relations.
+        """
+        mapper = sa.orm.class_mapper(self.obj)
+        state = sa.inspect(item)
+        for relation in mapper.relationships:
+            if relation.key not in state.dict:
+                continue
+            related = state.dict[relation.key]
+            for local, remote in relation.local_remote_pairs:
+                value = None
+                if related is not None:
+                    value = getattr(related, relation.mapper.get_property_by_column(remote).key)
+                setattr(item, mapper.get_property_by_column(local).key, value)
+
+    def _delete_all_files(self, items):
+        file_cols = [col for col in self.get_file_column_list() if self.is_file(col)]
+        image_cols = [col for col in self.get_image_column_list() if self.is_image(col)]
+        if not (file_cols or image_cols):
+            return
+        fm = FileManager()
+        im = ImageManager()
+        for item in items:
+            for file_col in file_cols:
+                if getattr(item, file_col):
+                    fm.delete_file(getattr(item, file_col))
+            for file_col in image_cols:
+                if getattr(item, file_col):
+                    im.delete_file(getattr(item, file_col))
+
     def _delete_files(self, item):
         for file_col in self.get_file_column_list():
             if self.is_file(file_col):
@@ -414,7 +904,8 @@ class SQLAInterface(BaseInterface):
         return self.session.query(model).all()
 
     def get_related_interface(self, col_name):
-        return self.__class__(self.get_related_model(col_name), self.session)
+        return self.__class__(self.get_related_model(col_name), self.session,
+                              query_cache=self.query_cache)
 
     def get_related_obj(self, col_name, value):
         rel_model = self.get_related_model(col_name)
@@ -509,6 +1000,39 @@ class SQLAInterface(BaseInterface):
             return query.first()
         return self.session.query(self.obj).get(id)
 
+    def _get_pk_values(self, pks):
+        """
+            Returns the keys converted to the primary key type,
+            keys that can't be converted don't exist and are left out
+        """
+        pk_name = self.get_pk_name()
+        if self.is_integer(pk_name):
+            pk_type = int
+        elif self.is_float(pk_name):
+            pk_type = float
+        elif self.is_numeric(pk_name):
+            pk_type = decimal.Decimal
+        else:
+            return list(pks)
+        values = []
+        for pk in pks:
+            try:
+                values.append(pk_type(as_unicode(pk)))
+            except (TypeError, ValueError, decimal.InvalidOperation):
+                log.debug("Invalid key {0} for {1}".format(pk, self.model_name))
+        return values
+
+    def get_many(self, pks, filters=None):
+        pk = self._get_attr(self.get_pk_name())
+        pks = self._get_pk_values(pks)
+        items = []
+        for i in range(0, len(pks), self.bulk_chunk_size):
+            query = self.session.query(self.obj).filter(pk.in_(pks[i:i + self.bulk_chunk_size]))
+            if filters:
+                query = self._get_base_query(query=query, filters=filters)
+            items.extend(query.all())
+        return self._order_by_pks(items, pks)
+
     def get_pk_name(self):
         for col_name in self.list_columns.keys():
             if self.is_pk(col_name):
@@ -1,6 +1,8 @@
 import datetime
 import logging
-from flask import url_for, g, session
+import time
+from contextlib import contextmanager
+from flask import url_for, g, session, request
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import LoginManager, current_user
 from flask_openid import OpenID
@@ -11,13 +13,15 @@ from .views import AuthDBView, AuthOIDView, ResetMyPasswordView, AuthLDAPView, A
     UserInfoEditView
 from .registerviews import RegisterUserDBView, RegisterUserOIDView, RegisterUserOAuthView
 from ..basemanager import BaseManager
+from .._compat import as_unicode
 from ..const import AUTH_OID, AUTH_DB, AUTH_LDAP, \
                     AUTH_REMOTE_USER, AUTH_OAUTH, \
                     LOGMSG_ERR_SEC_AUTH_LDAP, \
                     LOGMSG_ERR_SEC_AUTH_LDAP_TLS, \
                     LOGMSG_WAR_SEC_NO_USER, \
                     LOGMSG_WAR_SEC_NOLDAP_OBJ, \
-                    LOGMSG_WAR_SEC_LOGIN_FAILED
+                    LOGMSG_WAR_SEC_LOGIN_FAILED, \
+                    LOGMSG_ERR_SEC_GET_VERSION
 
 log = logging.getLogger(__name__)
 
@@ -85,6 +89,70 @@ def _oauth_tokengetter(token=None):
     return token
 
 
+class SessionRole(object):
+    """
+        Role snapshot kept on the session user, only holds the role name
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+class SessionUser(object):
+    """
+        Lightweight user rebuilt from the signed session snapshot,
+        used when AUTH_USER_SESSION_CACHE is enabled.
+        Attributes not on the snapshot are read from the user model object,
+        loaded on first use. That includes the SQLAlchemy instance state,
+        so it can be compared with relations on filters, like created_by.
+    """
+    def __init__(self, snapshot, pk, load_user=None):
+        self.id = pk
+        self.username = snapshot['username']
+        self.first_name = snapshot['first_name']
+        self.last_name = snapshot['last_name']
+        self.active = snapshot['active']
+        self.roles = [SessionRole(name) for name in snapshot['roles']]
+        self._load_user = load_user
+        self._user = None
+
+    def get_user(self):
+        """
+            Returns the user model object, loaded on first use
+        """
+        if self._user is None and self._load_user:
+            self._user = self._load_user(self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_load_user', '_user'):
+            raise AttributeError(name)
+        user = self.get_user()
+        if user is None:
+            raise AttributeError(name)
+        return getattr(user, name)
+
+    def is_authenticated(self):
+        return True
+
+    def is_active(self):
+        return self.active
+
+    def is_anonymous(self):
+        return False
+
+    def get_id(self):
+        return as_unicode(self.id)
+
+    def get_full_name(self):
+        return u'{0} {1}'.format(self.first_name, self.last_name)
+
+    def __repr__(self):
+        return self.get_full_name()
+
+
 class BaseSecurityManager(AbstractSecurityManager):
     auth_view = None
     """ The obj instance for authentication view """
@@ -105,6 +173,18 @@ class BaseSecurityManager(AbstractSecurityManager):
     oauth_tokengetter = _oauth_tokengetter
     """ OAuth tokengetter function override to implement your own tokengetter method """
     oauth_user_info = None
+    _role_permissions = None
+    """ Index of role names to frozensets of (permission_name, view_menu_name) """
+    _public_permissions = None
+    """ Frozenset of (permission_name, view_menu_name) from the public role """
+    _public_permissions_hits = 0
+    _public_permissions_misses = 0
+    _security_version = None
+    """ The last known security version, used to detect changes from other processes """
+    _security_version_checked = 0
+    """ Timestamp of the last security version check """
+    _permission_batch_depth = 0
+    _permission_batch_changed = False
 
     user_model = None
     """ Override to set your own User Model """
@@ -169,6 +249,9 @@ class BaseSecurityManager(AbstractSecurityManager):
         app.config.setdefault('AUTH_ROLE_ADMIN', 'Admin')
         app.config.setdefault('AUTH_ROLE_PUBLIC', 'Public')
         app.config.setdefault('AUTH_TYPE', AUTH_DB)
+        app.config.setdefault('AUTH_SECURITY_VERSION_INTERVAL', 5)
+        app.config.setdefault('AUTH_USER_SESSION_CACHE', False)
+        app.config.setdefault('AUTH_USER_SESSION_CACHE_TIMEOUT', 300)
         # Self Registration
         app.config.setdefault('AUTH_USER_REGISTRATION', False)
         app.config.setdefault('AUTH_USER_REGISTRATION_ROLE', self.auth_role_public)
@@ -235,6 +318,18 @@ class BaseSecurityManager(AbstractSecurityManager):
     def auth_role_public(self):
         return self.appbuilder.get_app.config['AUTH_ROLE_PUBLIC']
 
+    @property
+    def auth_security_version_interval(self):
+        return self.appbuilder.get_app.config['AUTH_SECURITY_VERSION_INTERVAL']
+
+    @property
+    def auth_user_session_cache(self):
+        return self.appbuilder.get_app.config['AUTH_USER_SESSION_CACHE']
+
+    @property
+    def auth_user_session_cache_timeout(self):
+        return self.appbuilder.get_app.config['AUTH_USER_SESSION_CACHE_TIMEOUT']
+
     @property
     def auth_ldap_server(self):
         return self.appbuilder.get_app.config['AUTH_LDAP_SERVER']
@@ -741,23 +836,137 @@ class BaseSecurityManager(AbstractSecurityManager):
             :param view_name:
                 the name of the class view (child of BaseView)
         """
-        permissions = self.get_public_permissions()
-        if permissions:
-            for i in permissions:
-                if (view_name == i.view_menu.name) and (permission_name == i.permission.name):
-                    return True
-            return False
+        return (permission_name, view_name) in self.get_public_permissions_set()
+
+    def _get_permissions_set(self, permissions):
+        """
+            Returns a frozenset of (permission_name, view_menu_name)
+            tuples from a list of PermissionView
+
+            :param permissions: list of PermissionView objects
+        """
+        return frozenset((pv.permission.name, pv.view_menu.name)
+                         for pv in permissions or []
+                         if pv.permission and pv.view_menu)
+
+    def build_permission_index(self):
+        """
+            Builds the in memory permission index for all roles.
+            Permission checks will use this index, instead of
+            walking the roles and permissions relationships.
+        """
+        index = {}
+        for role in self.get_all_roles():
+            index[role.name] = self._get_permissions_set(role.permissions)
+        self._role_permissions = index
+        return index
+
+    def invalidate_permission_index(self, bump_version=True):
+        """
+            Discards the in memory permission index, it will
+            be rebuilt on the next permission check.
+            Call it after changing roles or permissions.
+
+            :param bump_version:
+                If True increments the security version on the backend,
+                so that other processes will rebuild their indexes also.
+                Inside a permission_batch the version is incremented once, when it ends.
+        """
+        self._role_permissions = None
+        self.invalidate_public_permissions()
+        if bump_version:
+            if self._permission_batch_depth:
+                self._permission_batch_changed = True
+            else:
+                self._security_version = self.bump_security_version()
+
+    @contextmanager
+    def permission_batch(self):
+        """
+            Context manager that increments the security version only once
+            for all the role and permission changes made inside it.
+        """
+        self._permission_batch_depth += 1
+        try:
+            yield
+        finally:
+            self._permission_batch_depth -= 1
+            if not self._permission_batch_depth and self._permission_batch_changed:
+                self._permission_batch_changed = False
+                self._security_version = self.bump_security_version()
+
+    def check_security_version(self):
+        """
+            Compares the backend security version with the last known one,
+            and discards the local permission indexes if it has changed.
+            Checks at most once every AUTH_SECURITY_VERSION_INTERVAL seconds.
+        """
+        now = time.time()
+        if now - self._security_version_checked < self.auth_security_version_interval:
+            return
+        self._security_version_checked = now
+        try:
+            version = self.get_security_version()
+        except Exception as e:
+            # keep serving with the cached indexes, it's checked again later
+            log.error(LOGMSG_ERR_SEC_GET_VERSION.format(str(e)))
+            return
+        if version != self._security_version:
+            self.invalidate_permission_index(bump_version=False)
+            self._security_version = version
+
+    def invalidate_public_permissions(self):
+        """
+            Discards the cached public role permissions, they will
+            be fetched again on the next anonymous permission check.
+        """
+        self._public_permissions = None
+
+    def get_public_permissions_set(self):
+        """
+            Returns the cached frozenset of (permission_name, view_menu_name)
+            from the public role, fetches it from the backend on a miss.
+        """
+        permissions = self._public_permissions
+        if permissions is None:
+            self._public_permissions_misses += 1
+            permissions = self._get_permissions_set(self.get_public_permissions())
+            self._public_permissions = permissions
         else:
-            return False
+            self._public_permissions_hits += 1
+        return permissions
+
+    def get_public_permissions_cache_stats(self):
+        """
+            Returns a dict with the public permissions cache hits and misses
+        """
+        return {'hits': self._public_permissions_hits,
+                'misses': self._public_permissions_misses}
+
+    def get_role_permissions(self, role):
+        """
+            Returns the frozenset of (permission_name, view_menu_name)
+            for a role, using the in memory permission index.
+
+            :param role: The role object
+        """
+        index = self._role_permissions
+        if index is None:
+            index = self.build_permission_index()
+        permissions = index.get(role.name)
+        if permissions is None:
+            name = role.name
+            if isinstance(role, SessionRole):
+                # session roles only hold the name
+                role = self.find_role(name)
+            permissions = self._get_permissions_set(role.permissions if role else None)
+            index[name] = permissions
+        return permissions
 
     def _has_view_access(self, user, permission_name, view_name):
-        roles = user.roles
-        for role in roles:
-            permissions = role.permissions
-            if permissions:
-                for permission in permissions:
-                    if (view_name == permission.view_menu.name) and (permission_name == permission.permission.name):
-                        return True
+        for role in user.roles:
+            if (permission_name, view_name) in self.get_role_permissions(role):
+                return True
         return False
 
     def has_access(self, permission_name, view_name):
@@ -778,6 +987,10 @@ class BaseSecurityManager(AbstractSecurityManager):
             :param view_menu:
                 name of the view or menu to add
         """
+        with self.permission_batch():
+            self._add_permissions_view(base_permissions, view_menu)
+
+    def _add_permissions_view(self, base_permissions, view_menu):
         view_menu_db = self.add_view_menu(view_menu)
         perm_views = self.find_permissions_view_menu(view_menu_db)
 
@@ -804,6 +1017,7 @@ class BaseSecurityManager(AbstractSecurityManager):
                     for role in roles:
                         self.del_permission_role(role, perm)
                     self.del_permission_view_menu(perm_view.permission.name, view_menu)
+                    self.invalidate_permission_index()
                 elif perm_view not in role_admin.permissions:
                     # Role Admin must have all permissions
                     self.add_permission_role(role_admin, perm_view)
@@ -822,30 +1036,64 @@ class BaseSecurityManager(AbstractSecurityManager):
             role_admin = self.find_role(self.auth_role_admin)
             self.add_permission_role(role_admin, pv)
 
-    def security_cleanup(self, baseviews, menus):
+    def sync_permissions(self, view_permissions, menu_names):
+        """
+            Syncs all views and menus permissions with the backend.
+            Adds missing permissions, removes view permissions that no
+            longer exist on base_permissions and makes sure the Admin
+            role has all of them.
+
+            Backends should override this to do it in bulk, this generic
+            version calls add_permissions_view and add_permissions_menu.
+
+            :param view_permissions:
+                dict with view names as keys and lists of base permissions as values
+            :param menu_names:
+                list of menu names
+            :return:
+                tuple with lists of added and removed (permission_name, view_menu_name)
+        """
+        before = self._get_permissions_set(self.get_all_permissions_views())
+        with self.permission_batch():
+            for view_name, base_permissions in view_permissions.items():
+                self.add_permissions_view(base_permissions, view_name)
+            for menu_name in menu_names:
+                self.add_permissions_menu(menu_name)
+        after = self._get_permissions_set(self.get_all_permissions_views())
+        return sorted(after - before), sorted(before - after)
+
+    def security_cleanup(self, baseviews, menus, dry_run=False):
         """
-            Will cleanup all unused permissions from the database
+            Will cleanup all unused permissions from the database.
+            Compares the view menu names on the backend against the names
+            of the registered views and menus, and deletes the unused ones
+            with all their permissions in bulk.
 
             :param baseviews: A list of BaseViews class
             :param menus: Menu class
-        """
-        viewsmenus = self.get_all_view_menu()
-        roles = self.get_all_roles()
-        for viewmenu in viewsmenus:
-            found = False
-            for baseview in baseviews:
-                if viewmenu.name == baseview.__class__.__name__:
-                    found = True
-                    break
-            if menus.find(viewmenu.name):
-                found = True
-            if not found:
-                permissions = self.find_permissions_view_menu(viewmenu)
-                for permission in permissions:
-                    for role in roles:
-                        self.del_permission_role(role, permission)
-                    self.del_permission_view_menu(permission.permission.name, viewmenu.name)
-                self.del_view_menu(viewmenu.name)
+            :param dry_run: If True will only return the planned deletions
+            :return: tuple with the list of deleted view menu names
+                and the list of deleted (permission_name, view_menu_name),
+                both empty if the deletion failed
+        """
+        names = set(baseview.__class__.__name__ for baseview in baseviews)
+        names.update(menus.get_names())
+        view_menus = [view_menu for view_menu in self.get_all_view_menu()
+                      if view_menu.name not in names]
+        view_menu_names = set(view_menu.name for view_menu in view_menus)
+        if not view_menu_names:
+            return [], []
+        perm_views = sorted((pv.permission.name, pv.view_menu.name)
+                            for pv in self.get_all_permissions_views()
+                            if pv.permission and pv.view_menu and
+                            pv.view_menu.name in view_menu_names)
+        if not dry_run:
+            with self.permission_batch():
+                deleted = self.del_view_menus(view_menus)
+                self.invalidate_permission_index()
+            if not deleted:
+                return [], []
+        return sorted(view_menu_names), perm_views
 
     """
      ---------------------------
@@ -937,6 +1185,20 @@ class BaseSecurityManager(AbstractSecurityManager):
         """
         raise NotImplementedError
 
+    def get_security_version(self):
+        """
+            Returns the current security version from the backend,
+            it's incremented on every role or permission change
+        """
+        raise NotImplementedError
+
+    def bump_security_version(self):
+        """
+            Increments the security version on the backend
+            and returns the new version
+        """
+        raise NotImplementedError
+
     def find_permission(self, name):
         """
             Finds and returns a Permission by name
@@ -992,6 +1254,26 @@ class BaseSecurityManager(AbstractSecurityManager):
         """
         raise NotImplementedError
 
+    def del_view_menus(self, view_menus):
+        """
+            Deletes a list of ViewMenus from the backend, with all
+            their permissions on views and role associations.
+            Override to implement a bulk delete on your backend
+
+            :param view_menus:
+                list of ViewMenu objects
+            :return: True if they were all deleted
+        """
+        roles = self.get_all_roles()
+        for view_menu in view_menus:
+            for perm_view in self.find_permissions_view_menu(view_menu):
+                for role in roles:
+                    self.del_permission_role(role, perm_view)
+                self.del_permission_view_menu(perm_view.permission.name, view_menu.name)
+            self.del_view_menu(view_menu.name)
+        # the single deletes only log their errors
+        return not any(self.find_view_menu(view_menu.name) for view_menu in view_menus)
+
     """
     ----------------------
      PERMISSION VIEW MENU
@@ -1012,6 +1294,12 @@ class BaseSecurityManager(AbstractSecurityManager):
         """
         raise NotImplementedError
 
+    def get_all_permissions_views(self):
+        """
+            Returns all PermissionView objects
+        """
+        raise NotImplementedError
+
     def add_permission_view_menu(self, permission_name, view_menu_name):
         """
             Adds a permission on a view or menu to the backend
@@ -1054,10 +1342,81 @@ class BaseSecurityManager(AbstractSecurityManager):
         """
         raise NotImplementedError
 
+    def get_session_user(self, pk):
+        """
+            Returns a SessionUser from the signed session snapshot,
+            None if there is no snapshot or if it's stale.
+            A snapshot is stale if it belongs to another user, is older
+            than AUTH_USER_SESSION_CACHE_TIMEOUT seconds or was taken
+            on a different security version.
+
+            :param pk: The user id stored by Flask-Login
+        """
+        snapshot = session.get('user_snapshot')
+        if not snapshot or snapshot.get('id') != as_unicode(pk):
+            return None
+        if time.time() - snapshot.get('ts', 0) > self.auth_user_session_cache_timeout:
+            return None
+        if snapshot.get('version') != self._security_version:
+            return None
+        return SessionUser(snapshot, self._get_user_pk(pk), self.get_user_by_id)
+
+    def set_session_user(self, user):
+        """
+            Stores a compact snapshot of the user on the signed session
+
+            :param user: The user model object
+        """
+        session['user_snapshot'] = {'id': user.get_id(),
+                                    'username': user.username,
+                                    'first_name': user.first_name,
+                                    'last_name': user.last_name,
+                                    'active': bool(user.active),
+                                    'roles': [role.name for role in user.roles],
+                                    'version': self._security_version,
+                                    'ts': time.time()}
+
+    def del_session_user(self):
+        """
+            Removes the user snapshot from the current session
+        """
+        session.pop('user_snapshot', None)
+
+    def invalidate_session_users(self):
+        """
+            Makes all session user snapshots stale, on all processes.
+            Call it after changing users.
+        """
+        if self.auth_user_session_cache:
+            self._security_version = self.bump_security_version()
+
     def load_user(self, pk):
-        return self.get_user_by_id(int(pk))
+        """
+            Flask-Login user loader. If AUTH_USER_SESSION_CACHE is enabled
+            the user is rebuilt from the session snapshot, and the backend
+            is only queried when the snapshot is stale.
+        """
+        if not self.auth_user_session_cache:
+            return self._load_user(pk)
+        user = self.get_session_user(pk)
+        if user is None:
+            user = self._load_user(pk)
+            if user:
+                self.set_session_user(user)
+        return user
+
+    def _get_user_pk(self, pk):
+        """
+            Returns the user model primary key from the Flask-Login user id
+        """
+        return int(pk)
+
+    def _load_user(self, pk):
+        return self.get_user_by_id(self._get_user_pk(pk))
 
-    @staticmethod
-    def before_request():
+    def before_request(self):
         g.user = current_user
+        # static files don't check permissions
+        if request.endpoint and request.endpoint.split('.')[-1] != 'static':
+            self.check_security_version()
 
@@ -1,8 +1,9 @@
 import logging
 import uuid
+from bson.objectid import ObjectId
 from werkzeug.security import generate_password_hash
 from ...models.mongoengine.interface import MongoEngineInterface
-from .models import User, Role, PermissionView, Permission, ViewMenu, RegisterUser
+from .models import User, Role, PermissionView, Permission, ViewMenu, RegisterUser, SecurityVersion
 from ..manager import BaseSecurityManager
 from ... import const as c
 
@@ -25,6 +26,7 @@ class SecurityManager(BaseSecurityManager):
     viewmenu_model = ViewMenu
     permissionview_model = PermissionView
     registeruser_model = RegisterUser
+    securityversion_model = SecurityVersion
 
     def __init__(self, appbuilder):
         """
@@ -127,7 +129,10 @@ class SecurityManager(BaseSecurityManager):
     def get_user_by_id(self, pk):
         return self.user_model.objects(pk=pk).first()
 
-    def load_user(self, pk):
+    def _get_user_pk(self, pk):
+        return ObjectId(pk)
+
+    def _load_user(self, pk):
         return self.get_user_by_id(pk)
 
     """
@@ -142,6 +147,8 @@ class SecurityManager(BaseSecurityManager):
                 role = self.role_model(name=name)
                 role.save()
                 log.info(c.LOGMSG_INF_SEC_ADD_ROLE.format(name))
+                # a new role has no permissions to propagate
+                self.invalidate_permission_index(bump_version=False)
                 return role
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_ADD_ROLE.format(str(e)))
@@ -157,6 +164,20 @@ class SecurityManager(BaseSecurityManager):
         role = self.find_role(self.auth_role_public)
         return role.permissions
 
+    def get_security_version(self):
+        # concurrent first upserts can add more than one document
+        version = self.securityversion_model.objects.order_by('-version').first()
+        if version:
+            return version.version
+        return 0
+
+    def bump_security_version(self):
+        try:
+            self.securityversion_model.objects.update_one(inc__version=1, upsert=True)
+        except Exception as e:
+            log.error(c.LOGMSG_ERR_SEC_UPD_VERSION.format(str(e)))
+        return self.get_security_version()
+
     def find_permission(self, name):
         """
             Finds and returns a Permission by name
@@ -238,6 +259,26 @@ class SecurityManager(BaseSecurityManager):
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_DEL_PERMISSION.format(str(e)))
 
+    def del_view_menus(self, view_menus):
+        """
+            Deletes a list of ViewMenus in bulk, with all their permissions
+            on views and role associations.
+
+            :param view_menus:
+                list of ViewMenu objects
+            :return: True if they were deleted, False on errors
+        """
+        try:
+            perm_views = list(self.permissionview_model.objects(view_menu__in=view_menus))
+            if perm_views:
+                self.role_model.objects.update(pull_all__permissions=perm_views)
+                self.permissionview_model.objects(id__in=[pv.id for pv in perm_views]).delete()
+            self.viewmenu_model.objects(id__in=[view_menu.id for view_menu in view_menus]).delete()
+            return True
+        except Exception as e:
+            log.error(c.LOGMSG_ERR_SEC_DEL_PERMVIEW.format(str(e)))
+            return False
+
     """
     ----------------------
      PERMISSION VIEW MENU
@@ -260,6 +301,9 @@ class SecurityManager(BaseSecurityManager):
         """
         return self.permissionview_model.objects(view_menu=view_menu)
 
+    def get_all_permissions_views(self):
+        return self.permissionview_model.objects
+
     def add_permission_view_menu(self, permission_name, view_menu_name):
         """
             Adds a permission on a view or menu to the backend
@@ -319,6 +363,7 @@ class SecurityManager(BaseSecurityManager):
                 role.permissions.append(perm_view)
                 role.save()
                 log.info(c.LOGMSG_INF_SEC_ADD_PERMROLE.format(str(perm_view), role.name))
+                self.invalidate_permission_index()
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_ADD_PERMROLE.format(str(e)))
 
@@ -336,5 +381,6 @@ class SecurityManager(BaseSecurityManager):
                 role.permissions.remove(perm_view)
                 role.save()
                 log.info(c.LOGMSG_INF_SEC_DEL_PERMROLE.format(str(perm_view), role.name))
+                self.invalidate_permission_index()
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_DEL_PERMROLE.format(str(e)))
@@ -43,6 +43,13 @@ class PermissionView(Document):
         return str(self.permission).replace('_', ' ') + ' on ' + str(self.view_menu)
 
 
+class SecurityVersion(Document):
+    version = IntField(default=0)
+
+    def __unicode__(self):
+        return str(self.version)
+
+
 class Role(Document):
     meta = {'allow_inheritance': True,}  # Added for role extension via mongoengine Document inheritance
 
@@ -3,8 +3,9 @@ import uuid
 
 from sqlalchemy import func
 from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.orm import joinedload
 from werkzeug.security import generate_password_hash
-from .models import User, Permission, PermissionView, RegisterUser, ViewMenu, Role
+from .models import User, Permission, PermissionView, RegisterUser, ViewMenu, Role, SecurityVersion
 from ..manager import BaseSecurityManager
 from ...models.sqla.interface import SQLAInterface
 from ...models.sqla import Base
@@ -29,6 +30,9 @@ class SecurityManager(BaseSecurityManager):
     viewmenu_model = ViewMenu
     permissionview_model = PermissionView
     registeruser_model = RegisterUser
+    securityversion_model = SecurityVersion
+    bulk_chunk_size = 500
+    """ Max number of ids on each bulk statement """
 
     def __init__(self, appbuilder):
         """
@@ -74,6 +78,8 @@ class SecurityManager(BaseSecurityManager):
                 log.info(c.LOGMSG_INF_SEC_NO_DB)
                 Base.metadata.create_all(engine)
                 log.info(c.LOGMSG_INF_SEC_ADD_DB)
+            self.securityversion_model.__table__.create(engine, checkfirst=True)
+            self._add_security_version()
             super(SecurityManager, self).create_db()
         except Exception as e:
             log.error(c.LOGMSG_ERR_SEC_CREATE_DB.format(str(e)))
@@ -176,6 +182,14 @@ class SecurityManager(BaseSecurityManager):
     def get_user_by_id(self, pk):
         return self.get_session.query(self.user_model).get(pk)
 
+    def _load_user(self, pk):
+        """
+            Loads the current user with its roles eager loaded on a single query,
+            roles permissions are then checked against the permission index
+        """
+        return self.get_session.query(self.user_model).\
+            options(joinedload(self.user_model.roles)).get(self._get_user_pk(pk))
+
     """
     -----------------------
      PERMISSION MANAGEMENT
@@ -190,6 +204,8 @@ class SecurityManager(BaseSecurityManager):
                 self.get_session.add(role)
                 self.get_session.commit()
                 log.info(c.LOGMSG_INF_SEC_ADD_ROLE.format(name))
+                # a new role has no permissions to propagate
+                self.invalidate_permission_index(bump_version=False)
                 return role
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_ADD_ROLE.format(str(e)))
@@ -206,6 +222,40 @@ class SecurityManager(BaseSecurityManager):
         role = self.get_session.query(self.role_model).filter_by(name=self.auth_role_public).first()
         return role.permissions
 
+    def _add_security_version(self):
+        """
+            Adds the single security version row, with id 1
+            so that concurrent inserts conflict instead of adding two rows
+        """
+        try:
+            if not self.get_session.query(self.securityversion_model).get(1):
+                self.get_session.add(self.securityversion_model(id=1, version=0))
+                self.get_session.commit()
+        except Exception as e:
+            # another process added it first
+            log.debug(c.LOGMSG_ERR_SEC_UPD_VERSION.format(str(e)))
+            self.get_session.rollback()
+
+    def get_security_version(self):
+        # max tolerates the duplicate rows older versions could add
+        return self.get_session.query(func.max(self.securityversion_model.version)).scalar() or 0
+
+    def bump_security_version(self):
+        version_col = self.securityversion_model.version
+        for i in range(2):
+            try:
+                updated = self.get_session.query(self.securityversion_model).update(
+                    {version_col: version_col + 1}, synchronize_session=False)
+                self.get_session.commit()
+            except Exception as e:
+                log.error(c.LOGMSG_ERR_SEC_UPD_VERSION.format(str(e)))
+                self.get_session.rollback()
+                break
+            if updated:
+                break
+            self._add_security_version()
+        return self.get_security_version()
+
     def find_permission(self, name):
         """
             Finds and returns a Permission by name
@@ -297,6 +347,40 @@ class SecurityManager(BaseSecurityManager):
                 log.error(c.LOGMSG_ERR_SEC_DEL_PERMISSION.format(str(e)))
                 self.get_session.rollback()
 
+    def del_view_menus(self, view_menus):
+        """
+            Deletes a list of ViewMenus in bulk, with all their permissions
+            on views and role associations, on a single transaction.
+
+            :param view_menus:
+                list of ViewMenu objects
+            :return: True if they were deleted, False if nothing was
+        """
+        session = self.get_session
+        view_menu_ids = [view_menu.id for view_menu in view_menus]
+        secondary = self.role_model.permissions.property.secondary
+        pv_column = self.role_model.permissions.property.secondary_synchronize_pairs[0][1]
+        try:
+            # chunked to keep the IN clauses under the backend variable limits
+            for i in range(0, len(view_menu_ids), self.bulk_chunk_size):
+                chunk = view_menu_ids[i:i + self.bulk_chunk_size]
+                pv_ids = session.query(self.permissionview_model.id).\
+                    filter(self.permissionview_model.view_menu_id.in_(chunk))
+                session.execute(secondary.delete().where(pv_column.in_(pv_ids)))
+                session.query(self.permissionview_model).\
+                    filter(self.permissionview_model.view_menu_id.in_(chunk)).\
+                    delete(synchronize_session=False)
+                session.query(self.viewmenu_model).\
+                    filter(self.viewmenu_model.id.in_(chunk)).\
+                    delete(synchronize_session=False)
+            session.commit()
+            session.expire_all()
+            return True
+        except Exception as e:
+            log.error(c.LOGMSG_ERR_SEC_DEL_PERMVIEW.format(str(e)))
+            session.rollback()
+            return False
+
     """
     ----------------------
      PERMISSION VIEW MENU
@@ -319,6 +403,11 @@ class SecurityManager(BaseSecurityManager):
         """
         return self.get_session.query(self.permissionview_model).filter_by(view_menu_id=view_menu.id).all()
 
+    def get_all_permissions_views(self):
+        return self.get_session.query(self.permissionview_model).options(
+            joinedload(self.permissionview_model.permission),
+            joinedload(self.permissionview_model.view_menu)).all()
+
     def add_permission_view_menu(self, permission_name, view_menu_name):
         """
             Adds a permission on a view or menu to the backend
@@ -356,6 +445,79 @@ class SecurityManager(BaseSecurityManager):
             log.error(c.LOGMSG_ERR_SEC_DEL_PERMVIEW.format(str(e)))
             self.get_session.rollback()
 
+    def sync_permissions(self, view_permissions, menu_names):
+        """
+            Syncs all views and menus permissions in bulk.
+            Loads all permissions, view menus and permission views
+            with a few queries, diffs them in memory and applies all
+            changes on a single transaction.
+
+            :param view_permissions:
+                dict with view names as keys and lists of base permissions as values
+            :param menu_names:
+                list of menu names
+            :return:
+                tuple with lists of added and removed (permission_name, view_menu_name)
+            :raises: the backend error, after rolling back all changes
+        """
+        session = self.get_session
+        required = set()
+        for view_name, base_permissions in view_permissions.items():
+            for permission_name in base_permissions:
+                required.add((permission_name, view_name))
+        for menu_name in menu_names:
+            required.add(('menu_access', menu_name))
+        added, removed = [], []
+        try:
+            permissions = dict((perm.name, perm) for perm in session.query(self.permission_model))
+            view_menus = dict((vm.name, vm) for vm in session.query(self.viewmenu_model))
+            perm_views = dict(((pv.permission.name, pv.view_menu.name), pv)
+                              for pv in self.get_all_permissions_views()
+                              if pv.permission and pv.view_menu)
+            role_admin = self.find_role(self.auth_role_admin)
+            if role_admin is None:
+                log.warning(c.LOGMSG_WAR_SEC_NO_ADMIN_ROLE.format(self.auth_role_admin))
+            admin_perm_views = set(role_admin.permissions if role_admin else [])
+            for permission_name, view_name in sorted(required):
+                pv = perm_views.get((permission_name, view_name))
+                if pv is None:
+                    perm = permissions.get(permission_name)
+                    if perm is None:
+                        perm = self.permission_model()
+                        perm.name = permission_name
+                        session.add(perm)
+                        permissions[permission_name] = perm
+                    view_menu = view_menus.get(view_name)
+                    if view_menu is None:
+                        view_menu = self.viewmenu_model()
+                        view_menu.name = view_name
+                        session.add(view_menu)
+                        view_menus[view_name] = view_menu
+                    pv = self.permissionview_model()
+                    pv.permission, pv.view_menu = perm, view_menu
+                    session.add(pv)
+                    perm_views[(permission_name, view_name)] = pv
+                    added.append((permission_name, view_name))
+                    log.info(c.LOGMSG_INF_SEC_ADD_PERMVIEW.format(str(pv)))
+                if role_admin and pv not in admin_perm_views:
+                    # Role Admin must have all permissions
+                    role_admin.permissions.append(pv)
+                    admin_perm_views.add(pv)
+            for (permission_name, view_name), pv in sorted(perm_views.items()):
+                if view_name in view_permissions and (permission_name, view_name) not in required:
+                    # deleting the permission view also removes it from all roles
+                    session.delete(pv)
+                    removed.append((permission_name, view_name))
+                    log.info(c.LOGMSG_INF_SEC_DEL_PERMVIEW.format(permission_name, view_name))
+            session.commit()
+        except Exception as e:
+            log.error(c.LOGMSG_ERR_SEC_SYNC_PERMS.format(str(e)))
+            session.rollback()
+            raise
+        if added or removed:
+            self.invalidate_permission_index()
+        return added, removed
+
     def exist_permission_on_views(self, lst, item):
         for i in lst:
             if i.permission and i.permission.name == item:
@@ -383,6 +545,7 @@ class SecurityManager(BaseSecurityManager):
                 self.get_session.merge(role)
                 self.get_session.commit()
                 log.info(c.LOGMSG_INF_SEC_ADD_PERMROLE.format(str(perm_view), role.name))
+                self.invalidate_permission_index()
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_ADD_PERMROLE.format(str(e)))
                 self.get_session.rollback()
@@ -402,6 +565,7 @@ class SecurityManager(BaseSecurityManager):
                 self.get_session.merge(role)
                 self.get_session.commit()
                 log.info(c.LOGMSG_INF_SEC_DEL_PERMROLE.format(str(perm_view), role.name))
+                self.invalidate_permission_index()
             except Exception as e:
                 log.error(c.LOGMSG_ERR_SEC_DEL_PERMROLE.format(str(e)))
                 self.get_session.rollback()
@@ -63,6 +63,15 @@ class Role(Model):
         return self.name
 
 
+class SecurityVersion(Model):
+    __tablename__ = 'ab_security_version'
+    id = Column(Integer, Sequence('ab_security_version_id_seq'), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return str(self.version)
+
+
 assoc_user_role = Table('ab_user_role', Model.metadata,
                                   Column('id', Integer, Sequence('ab_user_role_id_seq'), primary_key=True),
                                   Column('user_id', Integer, ForeignKey('ab_user.id')),
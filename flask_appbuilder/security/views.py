@@ -108,6 +108,7 @@ class UserInfoEditView(SimpleFormView):
         item = self.appbuilder.sm.get_user_by_id(g.user.id)
         form.populate_obj(item)
         self.appbuilder.sm.update_user(item)
+        self.appbuilder.sm.del_session_user()
         flash(as_unicode(self.message), 'info')
 
 
@@ -187,6 +188,12 @@ class UserModelView(ModelView):
     def userinfoedit(self, item):
         return redirect(url_for(self.appbuilder.sm.userinfoeditview.__name__ + '.this_form_get'))
 
+    def post_update(self, item):
+        self.appbuilder.sm.invalidate_session_users()
+
+    def post_delete(self, item):
+        self.appbuilder.sm.invalidate_session_users()
+
 
 class UserOIDModelView(UserModelView):
     """
@@ -340,6 +347,15 @@ class RoleModelView(ModelView):
             self.datamodel.add(new_role)
         return redirect(self.get_redirect())
 
+    def post_add(self, item):
+        self.appbuilder.sm.invalidate_permission_index()
+
+    def post_update(self, item):
+        self.appbuilder.sm.invalidate_permission_index()
+
+    def post_delete(self, item):
+        self.appbuilder.sm.invalidate_permission_index()
+
 
 class RegisterUserModelView(ModelView):
     route_base = '/registeruser'
@@ -1,3 +1,41 @@
+//-----------------------------------------------------------
+// select2 options to fetch paged and searched data from the server
+//-----------------------------------------------------------
+function select2AjaxOptions(elem, url) {
+    var multiple = elem.attr('data-multiple') == 'true';
+    return {
+        placeholder: elem.attr('data-placeholder') || "Select",
+        allowClear: true,
+        multiple: multiple,
+        ajax: {
+            url: url,
+            dataType: 'json',
+            quietMillis: 250,
+            data: function (term, page) {
+                return {q: term, page: page - 1};
+            },
+            results: function (data, page, query) {
+                // endpoints like api/readvalues return a list of all the choices
+                if ($.isArray(data)) {
+                    var term = (query.term || "").toUpperCase();
+                    return {
+                        results: $.grep(data, function (item) {
+                            return String(item.text).toUpperCase().indexOf(term) >= 0;
+                        }),
+                        more: false
+                    };
+                }
+                return data;
+            }
+        },
+        initSelection: function (element, callback) {
+            var selection = $.parseJSON(element.attr('data-selection') || '[]');
+            callback(multiple ? selection : selection[0]);
+        }
+    };
+}
+
+
 //-----------------------------------------------------------
 // AJAX REST call to server to fetch data for select2 Slaves
 //-----------------------------------------------------------
@@ -5,25 +43,12 @@ function loadSelectDataSlave(elem) {
     $(".my_select2_ajax_slave").each(function( index ) {
         var elem = $(this);
         var master_id = elem.attr('master_id');
-        var master_val = $('#' + master_id).val();
-        if (master_val) {
-            var endpoint = elem.attr('endpoint');
-            endpoint = endpoint.replace("{{ID}}", master_val);
-            $.get( endpoint, function( data ) {
-                elem.select2({data: data, placeholder: "Select", allowClear: true});
-            });
-        }
-        else {
-            elem.select2({data: {id: "",text: ""}, placeholder: "Select", allowClear: true});
-        }
+        var url = function () {
+            return elem.attr('endpoint').replace("{{ID}}", $('#' + master_id).val());
+        };
+        elem.select2(select2AjaxOptions(elem, url));
         $('#' + master_id).on("change", function(e) {
-            var endpoint = elem.attr('endpoint');
-            if (e.val) {
-                endpoint = endpoint.replace("{{ID}}", e.val);
-                $.get( endpoint, function( data ) {
-                    elem.select2({data: data, placeholder: "Select", allowClear: true});
-                });
-            }
+            elem.select2("val", "");
         })
     });
 }
@@ -35,9 +60,18 @@ function loadSelectDataSlave(elem) {
 function loadSelectData() {
     $(".my_select2_ajax").each(function( index ) {
         var elem = $(this);
-        $.get( $(this).attr('endpoint'), function( data ) {
-            elem.select2({data: data, placeholder: "Select", allowClear: true});
-        });
+        elem.select2(select2AjaxOptions(elem, elem.attr('endpoint')));
+    });
+}
+
+
+//----------------------------------------------------------
+// Select2 for large related tables, paged from the server
+//----------------------------------------------------------
+function loadSelectDataPaged() {
+    $(".my_select2_ajax_paged").each(function( index ) {
+        var elem = $(this);
+        elem.select2(select2AjaxOptions(elem, elem.attr('endpoint')));
     });
 }
 
@@ -53,6 +87,7 @@ $(document).ready(function() {
     $(".my_select2").select2({placeholder: "Select a State", allowClear: true});
     loadSelectData();
     loadSelectDataSlave();
+    loadSelectDataPaged();
     $(".my_select2.readonly").select2("readonly",true);
     $("a").tooltip({container:'.row', 'placement': 'bottom'});
 });
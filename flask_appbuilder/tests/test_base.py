@@ -5,6 +5,7 @@ import random
 import datetime
 import json
 import logging
+from contextlib import contextmanager
 
 try:
     import enum
@@ -13,13 +14,14 @@ except ImportError:
     _has_enum = False
 
 from nose.tools import eq_, ok_
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Float, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Float, Enum, event
 from sqlalchemy.orm import relationship
 from flask import redirect, request, session
 
 from flask_appbuilder import Model, SQLA
 from flask_appbuilder.models.sqla.filters import FilterStartsWith, FilterEqual
 from flask_appbuilder.models.mixins import FileColumn, ImageColumn
+from flask_appbuilder.models.decorators import renders
 from flask_appbuilder.views import MasterDetailView, CompactCRUDMixin
 from flask_appbuilder.charts.views import (ChartView, TimeChartView,
                                            DirectChartView, GroupByChartView,
@@ -79,6 +81,14 @@ class Model2(Model):
     def field_method(self):
        return "field_method_value"
 
+    @renders('field_integer')
+    def field_renders(self):
+        return '{0} {1}'.format(self.field_integer, self.field_float)
+
+    @renders('field_integer', columns=['field_integer', 'field_float'])
+    def field_renders_declared(self):
+        return '{0} {1}'.format(self.field_integer, self.field_float)
+
 if _has_enum:
     class TestEnum(enum.Enum):
         e1 = 'a'
@@ -273,6 +283,23 @@ class FlaskTestCase(unittest.TestCase):
     def logout(self, client):
         return client.get('/logout/')
 
+    def get_view(self, class_name):
+        return [view for view in self.appbuilder.baseviews
+                if view.__class__.__name__ == class_name][0]
+
+    @contextmanager
+    def count_statements(self):
+        # Collects the SQL statements executed on the engine
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(self.db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(self.db.engine, 'before_cursor_execute', before_cursor_execute)
+
     def insert_data(self):
         for x, i in zip(string.ascii_letters[:23], range(23)):
             model = Model1(field_string="%stest" % (x), field_integer=i)
@@ -757,6 +784,48 @@ class FlaskTestCase(unittest.TestCase):
         # rv = client.get('/model2directchartview/chart/')
         #eq_(rv.status_code, 200)
 
+    def test_query_aggregate(self):
+        """
+            Test group by on the database matches grouping in python
+        """
+        from flask_appbuilder.models.sqla.interface import SQLAInterface
+        from flask_appbuilder.models.group import (GroupByProcessData, GroupByCol,
+                                                   GroupByDateMonth, GroupByDateYear)
+
+        self.insert_data2()
+        datamodel = SQLAInterface(Model2, self.db.session)
+        lst = self.db.session.query(Model2).all()
+        series = [(aggregate_sum, 'field_integer'), (aggregate_avg, 'field_integer'),
+                  (aggregate_count, 'field_integer')]
+        rows = datamodel.query_aggregate('field_integer', series)
+        eq_(rows, GroupByProcessData(['field_integer'], series, {}).apply(lst))
+        eq_(datamodel.query_aggregate('field_integer', [(lambda items, col: 0, 'field_integer')]), None)
+        eq_(datamodel.query_simple_group('field_string'),
+            GroupByCol('field_string', '').apply(lst))
+        eq_(datamodel.query_month_group('field_date'),
+            GroupByDateMonth('field_date', '').apply(lst))
+        eq_(datamodel.query_year_group('field_date'),
+            GroupByDateYear('field_date', '').apply(lst))
+
+        view = self.get_view('Model2GroupByChartView')
+        calls = []
+        query_aggregate = view.datamodel.query_aggregate
+
+        def spy_query_aggregate(*args, **kwargs):
+            rows = query_aggregate(*args, **kwargs)
+            calls.append(rows)
+            return rows
+        view.datamodel.query_aggregate = spy_query_aggregate
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        try:
+            rv = client.get('/model2groupbychartview/chart/')
+        finally:
+            del view.datamodel.query_aggregate
+        eq_(rv.status_code, 200)
+        eq_(len(calls), 1)
+        eq_(len(calls[0]), 10)
+
     def test_master_detail_view(self):
         """
             Test Master detail view
@@ -820,3 +889,762 @@ class FlaskTestCase(unittest.TestCase):
         item = self.db.session.query(Model1).filter_by(id=1).one()
         eq_(item.field_string, 'zzz')
         eq_(item.field_integer, field_integer_before)
+
+    def test_permission_index(self):
+        """
+            Test in memory permission index and its invalidation
+        """
+        sm = self.appbuilder.sm
+        user = sm.find_user(username=DEFAULT_ADMIN_USER)
+        ok_(sm._has_view_access(user, 'can_list', 'Model1View'))
+        ok_(not sm._has_view_access(user, 'can_list', 'NotAView'))
+        role_admin = sm.find_role('Admin')
+        pv = sm.find_permission_view_menu('can_list', 'Model1View')
+        sm.del_permission_role(role_admin, pv)
+        ok_(not sm._has_view_access(user, 'can_list', 'Model1View'))
+        sm.add_permission_role(role_admin, pv)
+        ok_(sm._has_view_access(user, 'can_list', 'Model1View'))
+
+    def test_public_permissions_cache(self):
+        """
+            Test cached public permissions and hit/miss counters
+        """
+        sm = self.appbuilder.sm
+        sm.invalidate_public_permissions()
+        stats = sm.get_public_permissions_cache_stats()
+        ok_(not sm.is_item_public('can_list', 'Model1View'))
+        ok_(not sm.is_item_public('can_show', 'Model1View'))
+        new_stats = sm.get_public_permissions_cache_stats()
+        eq_(new_stats['misses'], stats['misses'] + 1)
+        eq_(new_stats['hits'], stats['hits'] + 1)
+        role_public = sm.find_role('Public')
+        pv = sm.find_permission_view_menu('can_list', 'Model1View')
+        sm.add_permission_role(role_public, pv)
+        ok_(sm.is_item_public('can_list', 'Model1View'))
+
+    def test_security_version(self):
+        """
+            Test security version bump and permission index invalidation
+        """
+        sm = self.appbuilder.sm
+        version = sm.get_security_version()
+        role_admin = sm.find_role('Admin')
+        pv = sm.find_permission_view_menu('can_list', 'Model1View')
+        sm.del_permission_role(role_admin, pv)
+        eq_(sm.get_security_version(), version + 1)
+        # simulate a change made by another process
+        sm.build_permission_index()
+        sm._security_version = version
+        sm.check_security_version()
+        eq_(sm._role_permissions, None)
+        eq_(sm._security_version, version + 1)
+        # one bump for all the permissions of a view
+        sm.add_permissions_view(['can_list', 'can_show', 'can_add'], 'BatchView')
+        eq_(sm.get_security_version(), version + 2)
+        ok_(sm._has_view_access(sm.find_user(username=DEFAULT_ADMIN_USER), 'can_add', 'BatchView'))
+        # static files don't check the version
+        sm._security_version_checked = 0
+        client = self.app.test_client()
+        with self.count_statements() as statements:
+            rv = client.get('/static/appbuilder/css/ab.css')
+        eq_(rv.status_code, 200)
+        eq_(statements, [])
+        # a single row is kept, duplicates added by concurrent first bumps are tolerated
+        model = sm.securityversion_model
+        eq_([row.id for row in self.db.session.query(model).all()], [1])
+        self.db.session.add(model(version=version + 2))
+        self.db.session.commit()
+        eq_(sm.bump_security_version(), version + 3)
+        # backend errors keep the cached indexes
+        sm.build_permission_index()
+        sm._security_version_checked = 0
+        sm.get_security_version = lambda: 1 / 0
+        try:
+            sm.check_security_version()
+        finally:
+            del sm.get_security_version
+        ok_(sm._role_permissions is not None)
+
+    def test_sync_permissions(self):
+        """
+            Test bulk permissions sync
+        """
+        sm = self.appbuilder.sm
+        eq_(self.appbuilder.sync_permissions(), ([], []))
+        sm.add_permission_view_menu('can_xpto', 'Model1View')
+        pv = sm.find_permission_view_menu('can_list', 'Model1View')
+        self.db.session.delete(pv)
+        self.db.session.commit()
+        added, removed = self.appbuilder.sync_permissions()
+        eq_(added, [('can_list', 'Model1View')])
+        eq_(removed, [('can_xpto', 'Model1View')])
+        eq_(sm.find_permission_view_menu('can_xpto', 'Model1View'), None)
+        user = sm.find_user(username=DEFAULT_ADMIN_USER)
+        ok_(sm._has_view_access(user, 'can_list', 'Model1View'))
+        # without the admin role permissions are still synced
+        self.db.session.delete(sm.find_permission_view_menu('can_list', 'Model1View'))
+        self.db.session.commit()
+        sm.find_role('Admin').name = 'NotAdmin'
+        self.db.session.commit()
+        eq_(self.appbuilder.sync_permissions(), ([('can_list', 'Model1View')], []))
+        eq_(sm.find_permission_view_menu('can_list', 'Model1View').role, [])
+        # errors are raised, not reported as an empty sync
+        sm.get_all_permissions_views = lambda: 1 / 0
+        try:
+            self.assertRaises(ZeroDivisionError, self.appbuilder.sync_permissions)
+        finally:
+            del sm.get_all_permissions_views
+
+    def test_security_cleanup(self):
+        """
+            Test security cleanup of unused view menus, with dry run
+        """
+        sm = self.appbuilder.sm
+        role = sm.add_role('CleanupRole')
+        sm.add_permission_role(role, sm.add_permission_view_menu('can_list', 'OldView'))
+        sm.add_permission_view_menu('can_show', 'OldView')
+        planned = (['OldView'], [('can_list', 'OldView'), ('can_show', 'OldView')])
+        eq_(self.appbuilder.security_cleanup(dry_run=True), planned)
+        ok_(sm.find_view_menu('OldView'))
+        eq_(self.appbuilder.security_cleanup(), planned)
+        eq_(sm.find_view_menu('OldView'), None)
+        eq_(sm.find_role('CleanupRole').permissions, [])
+        ok_(sm.find_permission_view_menu('can_list', 'Model1View'))
+        eq_(self.appbuilder.security_cleanup(), ([], []))
+        # nothing is reported as deleted when the deletion fails
+        sm.add_permission_view_menu('can_list', 'OldView')
+        self.db.session.execute("CREATE TRIGGER keep_view_menu BEFORE DELETE ON ab_view_menu "
+                                "BEGIN SELECT RAISE(ABORT, 'kept'); END")
+        self.db.session.commit()
+        eq_(self.appbuilder.security_cleanup(), ([], []))
+        ok_(sm.find_permission_view_menu('can_list', 'OldView'))
+
+    def test_load_user(self):
+        """
+            Test load user with roles on a single query
+        """
+
+        sm = self.appbuilder.sm
+        user_id = sm.find_user(username=DEFAULT_ADMIN_USER).id
+        sm._role_permissions = sm.build_permission_index()
+        self.db.session.expunge_all()
+        with self.count_statements() as statements:
+            user = sm.load_user(str(user_id))
+            ok_(sm._has_view_access(user, 'can_list', 'Model1View'))
+            eq_([role.name for role in user.roles], [sm.auth_role_admin])
+        eq_(len(statements), 1)
+
+    def test_session_user_cache(self):
+        """
+            Test load user from the signed session snapshot
+        """
+        from flask_appbuilder.security.manager import SessionUser
+        from flask_appbuilder.models.sqla.interface import SQLAInterface
+        from flask_appbuilder.models.sqla.filters import FilterEqualFunction
+
+        sm = self.appbuilder.sm
+        user = sm.find_user(username=DEFAULT_ADMIN_USER)
+        self.app.config['AUTH_USER_SESSION_CACHE'] = True
+        try:
+            with self.app.test_request_context():
+                ok_(not isinstance(sm.load_user(user.get_id()), SessionUser))
+                session_user = sm.load_user(user.get_id())
+                ok_(isinstance(session_user, SessionUser))
+                eq_(session_user.get_full_name(), user.get_full_name())
+                eq_(session_user.id, user.id)
+                ok_(sm._has_view_access(session_user, 'can_list', 'Model1View'))
+                # attributes not on the snapshot are read from the user model
+                eq_(session_user._user, None)
+                eq_(session_user.email, user.email)
+                eq_(session_user.created_on, user.created_on)
+                ok_(session_user.get_user() is user)
+                # and it's compared with relations on filters
+                datamodel = SQLAInterface(sm.user_model, self.db.session)
+                _filters = datamodel.get_filters()
+                _filters.add_filter('created_by', FilterEqualFunction, lambda: session_user)
+                created = sm.add_user('created', 'created', 'user', 'created@fab.org',
+                                      sm.find_role('Admin'), 'password')
+                created.created_by = user
+                self.db.session.commit()
+                count, items = datamodel.query(_filters)
+                eq_((count, items), (1, [created]))
+                # roles missing from the index are fetched by name
+                sm._role_permissions = {}
+                ok_(sm._has_view_access(session_user, 'can_list', 'Model1View'))
+                sm.add_role('SessionRole')
+                eq_(sm._role_permissions, None)
+                sm.invalidate_session_users()
+                ok_(not isinstance(sm.load_user(user.get_id()), SessionUser))
+        finally:
+            self.app.config['AUTH_USER_SESSION_CACHE'] = False
+
+    def test_model_list_without_count(self):
+        """
+            Test count free pagination on list and api read
+        """
+        import json
+
+        self.insert_data2()
+        model2view = self.get_view('Model2View')
+        count, lst = model2view.datamodel.query(page=2, page_size=4, with_count=False)
+        eq_(count, None)
+        eq_(len(lst), 2)
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        model2view.list_count = False
+        try:
+            rv = client.get('/model2view/list/?_page_Model2View=1&_psize_Model2View=4')
+            eq_(rv.status_code, 200)
+            data = rv.data.decode('utf-8')
+            ok_('Record Count' not in data)
+            ok_('etest' in data)
+            rv = client.get('/model2view/api/read?_page_Model2View=1&_psize_Model2View=4')
+            data = json.loads(rv.data.decode('utf-8'))
+            eq_((data['count'], data['has_next'], len(data['result'])), (None, True, 4))
+            rv = client.get('/model2view/api/read?_page_Model2View=2&_psize_Model2View=4')
+            data = json.loads(rv.data.decode('utf-8'))
+            eq_((data['count'], data['has_next'], len(data['result'])), (None, False, 2))
+        finally:
+            model2view.list_count = True
+
+    def test_model_list_keyset(self):
+        """
+            Test keyset pagination with cursors on api read
+        """
+        import base64
+
+        self.insert_data2()
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        for order_column, order_direction in [('field_string', 'desc'), ('field_string', 'asc'), ('', '')]:
+            url = '/model2view/api/read?_oc_Model2View={0}&_od_Model2View={1}'.format(order_column,
+                                                                                     order_direction)
+            rv = client.get(url + '&_psize_Model2View=10')
+            expected = json.loads(rv.data.decode('utf-8'))['pks']
+            pks, cursor = [], None
+            while True:
+                rv = client.get(url + '&_psize_Model2View=3' +
+                                ('&_cursor_Model2View=' + cursor if cursor else ''))
+                data = json.loads(rv.data.decode('utf-8'))
+                pks.extend(data['pks'])
+                cursor = data['next_cursor']
+                if not cursor:
+                    break
+            eq_(len(expected), 10)
+            eq_(pks, expected)
+
+        # nullable columns have no keyset order
+        rv = client.get('/model2view/api/read?_oc_Model2View=field_integer&_od_Model2View=asc'
+                        '&_psize_Model2View=3')
+        data = json.loads(rv.data.decode('utf-8'))
+        ok_(data['has_next'])
+        eq_(data['next_cursor'], None)
+        # invalid cursors are refused
+        url = '/model2view/api/read?_oc_Model2View=field_string&_od_Model2View=asc&_psize_Model2View=3'
+        for values in [[None, 1], ['atest', 'x'], [1, 1], ['atest', True], ['atest']]:
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+            rv = client.get(url + '&_cursor_Model2View=' + cursor)
+            eq_(rv.status_code, 400)
+        rv = client.get(url + '&_cursor_Model2View=notacursor')
+        eq_(rv.status_code, 400)
+        # a cursor is only valid for the order it was made for
+        cursor = json.loads(client.get(url).data.decode('utf-8'))['next_cursor']
+        rv = client.get('/model2view/api/read?_psize_Model2View=3&_cursor_Model2View=' + cursor)
+        eq_(rv.status_code, 400)
+
+    def test_query_eager_loads(self):
+        """
+            Test relations on select columns are eager loaded
+        """
+        from flask_appbuilder.models.sqla.interface import SQLAInterface
+
+        self.insert_data2()
+        datamodel = SQLAInterface(Model2, self.db.session)
+        self.db.session.expunge_all()
+        with self.count_statements() as statements:
+            count, lst = datamodel.query(page_size=10, select_columns=['field_string', 'group.field_string'])
+            values = list(datamodel.get_values(lst, ['field_string', 'group.field_string']))
+        eq_(values[0]['group.field_string'], 'G1')
+        # one count and one select with the group joined
+        eq_(len(statements), 2)
+
+    def test_query_load_only(self):
+        """
+            Test columns not needed by select columns are deferred
+        """
+        from sqlalchemy import inspect
+        from flask_appbuilder.models.sqla.interface import SQLAInterface
+
+        self.insert_data2()
+        datamodel = SQLAInterface(Model2, self.db.session)
+        self.db.session.expunge_all()
+        count, lst = datamodel.query(page_size=10, order_column='field_integer', order_direction='asc',
+                                     select_columns=['field_string', 'group.field_string'])
+        unloaded = inspect(lst[0]).unloaded
+        ok_('field_float' in unloaded)
+        ok_('field_string' not in unloaded and 'field_integer' not in unloaded)
+        ok_('group_id' not in unloaded and 'id' not in unloaded)
+        self.db.session.expunge_all()
+        count, lst = datamodel.query(page_size=10, select_columns=['field_string', 'field_method'])
+        ok_('field_float' not in inspect(lst[0]).unloaded)
+        # columns are only deferred if methods declare the columns they read
+        for column, deferred in [('field_renders', False), ('field_renders_declared', True)]:
+            self.db.session.expunge_all()
+            with self.count_statements() as statements:
+                count, lst = datamodel.query(page_size=10, select_columns=['field_string', column])
+                values = [getattr(item, column)() for item in lst]
+            # the count and the select, no lazy loads per row
+            eq_(len(statements), 2)
+            eq_(len(values), 10)
+            eq_('field_date' in inspect(lst[0]).unloaded, deferred)
+
+    def test_model_export(self):
+        """
+            Test streaming CSV and JSON lines export
+        """
+        import json
+
+        self.insert_data2()
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        rv = client.get('/model2view/api/export/csv?_oc_Model2View=field_string&_od_Model2View=asc')
+        eq_(rv.status_code, 200)
+        lines = rv.data.decode('utf-8').splitlines()
+        eq_(lines[0], 'field_integer,field_float,field_string,field_method,group.field_string')
+        eq_(len(lines), 11)
+        ok_(lines[1].endswith(',atest,field_method_value,G1'))
+        rv = client.get('/model2view/api/export/ndjson?_flt_0_field_string=btest')
+        rows = [json.loads(line) for line in rv.data.decode('utf-8').splitlines()]
+        eq_([row['field_string'] for row in rows], ['btest'])
+        eq_(rows[0]['group.field_string'], 'G1')
+        rv = client.get('/model2view/api/export/xml')
+        eq_(rv.status_code, 404)
+
+    def test_model_delete_all(self):
+        """
+            Test bulk load and delete of selected records
+        """
+        self.insert_data2()
+        view = self.get_view('Model2View')
+        datamodel = view.datamodel
+        pks = [str(item.id) for item in self.db.session.query(Model2).all()]
+        _filters = datamodel.get_filters().add_filter('field_string', FilterStartsWith, 'a')
+        eq_([item.field_string for item in datamodel.get_many(pks, _filters)], ['atest'])
+        items = datamodel.get_many(pks)
+        eq_(len(items), 10)
+        deleted = []
+        view.post_delete_all = lambda items: deleted.extend(item.field_string for item in items)
+        try:
+            with self.count_statements() as statements:
+                with self.app.test_request_context():
+                    view._delete_all(items)
+        finally:
+            del view.post_delete_all
+        eq_(len(statements), 1)
+        eq_(len(deleted), 10)
+        eq_(self.db.session.query(Model2).count(), 0)
+
+    def test_model_bulk_api(self):
+        """
+            Test bulk create and update API
+        """
+        self.insert_data2()
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        g1 = self.db.session.query(Model1).filter_by(field_string='G1').one().id
+        g2 = self.db.session.query(Model1).filter_by(field_string='G2').one().id
+        data = [{'field_string': 'bulk%d' % i, 'field_integer': i, 'group': g1} for i in range(5)]
+        data.append({'field_integer': 1, 'group': g1})
+        rv = client.post('/model2view/api/bulk/create', data=json.dumps(data),
+                         content_type='application/json')
+        eq_(rv.status_code, 500)
+        results = json.loads(rv.data.decode('utf-8'))['results']
+        eq_([result['status'] for result in results], ['ok'] * 5 + ['error'])
+        ok_('field_string' in results[5]['error_details'])
+        items = self.db.session.query(Model2).filter(Model2.field_string.like('bulk%')).all()
+        eq_(len(items), 5)
+        eq_(set(item.group_id for item in items), set([g1]))
+        pks = dict((item.field_string, item.id) for item in items)
+        eq_([result['pk'] for result in results[:5]], [pks['bulk%d' % i] for i in range(5)])
+
+        data = [{'id': item.id, 'field_integer': 100, 'group': g2} for item in items]
+        data.append({'id': REDIRECT_OBJ_ID, 'field_integer': 100})
+        rv = client.put('/model2view/api/bulk/update', data=json.dumps(data),
+                        content_type='application/json')
+        results = json.loads(rv.data.decode('utf-8'))['results']
+        eq_([result['status'] for result in results], ['ok'] * 5 + ['error'])
+        self.db.session.expire_all()
+        items = self.db.session.query(Model2).filter(Model2.field_string.like('bulk%')).all()
+        eq_(set((item.field_integer, item.group_id) for item in items), set([(100, g2)]))
+        eq_(sorted(item.field_string for item in items), ['bulk%d' % i for i in range(5)])
+        rv = client.post('/model2view/api/bulk/create', data='{}', content_type='application/json')
+        eq_(rv.status_code, 400)
+
+        # a failing batch doesn't take the other batches with it
+        self.db.session.execute("CREATE TRIGGER reject_update BEFORE UPDATE ON model2 "
+                                "WHEN NEW.field_integer = 666 BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+        self.db.session.commit()
+        view = self.get_view('Model2View')
+        view.bulk_batch_size = 1
+        items = sorted(items, key=lambda item: item.field_string)[:3]
+        data = [{'id': item.id, 'field_integer': value} for item, value in zip(items, [1, 2, 666])]
+        try:
+            rv = client.put('/model2view/api/bulk/update', data=json.dumps(data),
+                            content_type='application/json')
+        finally:
+            del view.bulk_batch_size
+        eq_(rv.status_code, 500)
+        results = json.loads(rv.data.decode('utf-8'))['results']
+        eq_([result['status'] for result in results], ['ok', 'ok', 'error'])
+        self.db.session.expire_all()
+        eq_([self.db.session.query(Model2).get(item.id).field_integer for item in items], [1, 2, 100])
+
+    def test_get_many(self):
+        """
+            Test batched primary key lookup, on requested order
+        """
+        from wtforms import Form
+        from werkzeug.datastructures import MultiDict
+        from flask_appbuilder.fields import QuerySelectMultipleField
+
+        self.insert_data2()
+        view = self.get_view('Model2View')
+        datamodel = view.datamodel
+        items = self.db.session.query(Model2).order_by(Model2.field_string).all()
+        pks = [str(item.id) for item in reversed(items)] + [str(REDIRECT_OBJ_ID)]
+        eq_([item.field_string for item in datamodel.get_many(pks)],
+            [item.field_string for item in reversed(items)])
+        _filters = datamodel.get_filters().add_filter('field_string', FilterStartsWith, 'b')
+        eq_([item.field_string for item in datamodel.get_many(pks, _filters)], ['btest'])
+        # keys are converted to the primary key type, invalid ones are left out
+        with self.count_statements() as statements:
+            eq_(datamodel.get_many(['x', '1.5']), [])
+        eq_(statements, [])
+        eq_([item.field_string for item in datamodel.get_many([items[0].id, 'x'])],
+            [items[0].field_string])
+
+        queries = []
+
+        class TestForm(Form):
+            field = QuerySelectMultipleField(query_func=lambda: queries.append(1) or [],
+                                             get_pk_func=datamodel.get_pk_value,
+                                             get_many_func=datamodel.get_many)
+        form = TestForm(MultiDict([('field', pks[0]), ('field', pks[1])]))
+        ok_(form.validate())
+        eq_(sorted(item.field_string for item in form.field.data), ['itest', 'jtest'])
+        form = TestForm(MultiDict([('field', pks[0]), ('field', str(REDIRECT_OBJ_ID))]))
+        ok_(not form.validate())
+        form = TestForm(MultiDict([('field', pks[0]), ('field', 'x'), ('field', '0' + pks[1])]))
+        ok_(not form.validate())
+        eq_(form.field.errors, ['Not a valid choice: 0{0}, x'.format(pks[1])])
+        eq_(queries, [])
+
+    def test_lazy_related_field(self):
+        """
+            Test related fields switch to paged AJAX choices above a threshold
+        """
+        from werkzeug.datastructures import MultiDict
+        from flask_appbuilder.forms import GeneralModelConverter
+
+        self.insert_data2()
+        view = self.get_view('Model2View')
+        g1 = str(self.db.session.query(Model1).filter_by(field_string='G1').one().id)
+        conv = GeneralModelConverter(view.datamodel)
+        form_cls = conv.create_form(inc_columns=['field_string', 'group'],
+                                    ajax_threshold=2,
+                                    ajax_endpoint_func=lambda col_name: '/choices/' + col_name)
+        with self.app.test_request_context():
+            form = form_cls()
+            ok_(form.group.is_lazy())
+            html = form.group()
+            ok_('my_select2_ajax_paged' in html)
+            ok_('/choices/group' in html)
+            form = form_cls(MultiDict([('field_string', 'lazy'), ('group', g1)]))
+            ok_(form.validate())
+            eq_(form.group.data.field_string, 'G1')
+            form = form_cls(MultiDict([('field_string', 'lazy'), ('group', str(REDIRECT_OBJ_ID))]))
+            ok_(not form.validate())
+            form = conv.create_form(inc_columns=['group'], ajax_threshold=5,
+                                    ajax_endpoint_func=lambda col_name: '/choices/' + col_name)()
+            ok_(not form.group.is_lazy())
+            ok_('my_select2_ajax_paged' not in form.group())
+
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        rv = client.get('/model22view/api/column/add/group?page=0&q=G2')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_([item['text'] for item in data['results']], ['G2'])
+        eq_(data['more'], False)
+        rv = client.get('/model2view/api/column/add/group?page=0')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_([item['text'] for item in data['results']], ['G1'])
+
+    def test_related_column_api(self):
+        """
+            Test searched and paged related column choices
+        """
+        from flask_appbuilder.fields import AJAXSelectField
+        from flask_appbuilder.fieldwidgets import Select2AJAXWidget
+
+        self.insert_data2()
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        rv = client.get('/model22view/api/column/add/group?q=g2')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_([item['text'] for item in data['results']], ['G2'])
+        rv = client.get('/model22view/api/column/add/group?page_size=2')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_(len(data['results']), 2)
+        eq_(data['more'], True)
+        rv = client.get('/model22view/api/column/add/group?page_size=2&page=1')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_([item['text'] for item in data['results']], ['G3'])
+        eq_(data['more'], False)
+        rv = client.get('/model2view/api/column/edit/group?page=0')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_([item['text'] for item in data['results']], ['G2'])
+        # without paging arguments the legacy list is returned
+        rv = client.get('/model2view/api/column/edit/group')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_([item['text'] for item in data], ['G2'])
+
+        view = self.get_view('Model2View')
+        g1 = self.db.session.query(Model1).filter_by(field_string='G1').one()
+        field = AJAXSelectField(datamodel=view.datamodel, col_name='group',
+                                widget=Select2AJAXWidget(endpoint='/choices'))
+        with self.app.test_request_context():
+            from flask_wtf import FlaskForm
+
+            class TestForm(FlaskForm):
+                group = field
+            form = TestForm(obj=self.db.session.query(Model2).first())
+            eq_(form.group.get_selection(), [{'id': str(g1.id), 'text': 'G1'}])
+            ok_('data-selection=' in form.group())
+
+    def test_query_cache(self):
+        """
+            Test cached query results and their invalidation on commit
+        """
+        from flask_appbuilder.models.sqla.interface import SQLAInterface
+        from flask_appbuilder.models.sqla.cache import SimpleQueryCache
+
+        self.insert_data2()
+        datamodel = SQLAInterface(Model2, self.db.session, query_cache=SimpleQueryCache())
+        _filters = datamodel.get_filters().add_filter('field_string', FilterStartsWith, 'a')
+        count, items = datamodel.query(_filters, 'field_string', 'asc', page=0, page_size=5)
+        eq_((count, [item.field_string for item in items]), (1, ['atest']))
+
+        with self.count_statements() as statements:
+            count, items = datamodel.query(_filters, 'field_string', 'asc', page=0, page_size=5)
+            eq_((count, [item.field_string for item in items]), (1, ['atest']))
+            eq_(statements, [])
+        ok_(items[0] in self.db.session)
+
+        group = self.db.session.query(Model1).filter_by(field_string='G1').one()
+        self.db.session.add(Model2(field_string='abulk', group=group))
+        self.db.session.commit()
+        count, items = datamodel.query(_filters, 'field_string', 'asc', page=0, page_size=5)
+        eq_((count, [item.field_string for item in items]), (2, ['abulk', 'atest']))
+        ok_(datamodel.delete_all(items))
+        eq_(datamodel.query(_filters)[0], 0)
+        _filters = datamodel.get_filters().add_filter('field_string', FilterStartsWith, 'b')
+        eq_(datamodel.query(_filters, select_columns=['group.field_string'])[1][0].group.field_string, 'G1')
+        group = self.db.session.query(Model1).filter_by(field_string='G1').one()
+        group.field_string = 'G9'
+        self.db.session.commit()
+        eq_(datamodel.query(_filters, select_columns=['group.field_string'])[1][0].group.field_string, 'G9')
+
+        # results are cached as JSON row values and rebuilt with their loaded relations
+        cache = SimpleQueryCache()
+        datamodel = SQLAInterface(Model2, self.db.session, query_cache=cache)
+        count, items = datamodel.query(_filters, select_columns=['field_date', 'group.field_string'])
+        expected = [(item.id, item.field_date, item.group.field_string) for item in items]
+        value = list(cache._items.values())[0][1]
+        eq_(json.loads(value)[0], 1)
+        self.db.session.expunge_all()
+        with self.count_statements() as statements:
+            count, items = datamodel.query(_filters, select_columns=['field_date', 'group.field_string'])
+            eq_([(item.id, item.field_date, item.group.field_string) for item in items], expected)
+        eq_(statements, [])
+        # values that are not JSON rows are ignored
+        import pickle
+        for key in list(cache._items.keys()):
+            cache.set(key, pickle.dumps((1, [])))
+        count, items = datamodel.query(_filters, select_columns=['field_date', 'group.field_string'])
+        eq_([item.field_string for item in items], ['btest'])
+
+    def test_request_filters(self):
+        """
+            Test URL filters are request scoped and never change the view's catalog
+        """
+        self.insert_data2()
+        view = self.get_view('Model2View')
+        with self.app.test_request_context('/model2view/list/?_flt_0_field_string=b'):
+            filters = view._get_request_filters()
+            with self.app.test_request_context('/model2view/list/?_flt_0_field_string=c'):
+                other_filters = view._get_request_filters()
+            eq_(filters.get_filter_value('field_string'), 'b')
+            eq_(other_filters.get_filter_value('field_string'), 'c')
+            ok_(filters.get_search_filters() is view._filters.get_search_filters())
+        eq_(view._filters.filters, [])
+
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        rv = client.get('/model2view/api/read?_flt_0_field_string=btest')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_(data['count'], 1)
+        eq_(view._filters.filters, [])
+        rv = client.get('/model2view/api/read')
+        data = json.loads(rv.data.decode('utf-8'))
+        eq_(data['count'], 10)
+
+    def test_url_args(self):
+        """
+            Test the query string is parsed once, ignoring malformed values
+        """
+        from flask_appbuilder.urltools import get_url_args, get_page_args, get_order_args
+
+        url = ('/model2view/list/?page_Model2View=2&psize_Model2View=x&page_Other=-1'
+               '&_oc_Model2View=field_string&_od_Model2View=asc&_oc_Other=id&_od_Other=up'
+               '&_cursor_Model2View=abc&_flt_0_field_string=b&_flt_9_field_string=c'
+               '&_flt_0_nocolumn=d&_flt_0_homepage=e')
+        view = self.get_view('Model2View')
+        with self.app.test_request_context(url):
+            url_args = get_url_args()
+            ok_(get_url_args() is url_args)
+            eq_(get_page_args(), {'Model2View': 2})
+            eq_(url_args.page_sizes, {})
+            eq_(get_order_args(), {'Model2View': ('field_string', 'asc')})
+            eq_(url_args.cursors, {'Model2View': 'abc'})
+            filters = view._get_request_filters()
+            eq_([(flt.column_name, value) for flt, value in filters.get_filters_values()],
+                [('field_string', 'b')])
+
+        self.insert_data2()
+        client = self.app.test_client()
+        self.login(client, DEFAULT_ADMIN_USER, DEFAULT_ADMIN_PASSWORD)
+        rv = client.get('/model2view/list/?page_Model2View=a&psize_Model2View=-5')
+        eq_(rv.status_code, 200)
+
+    def test_filter_joins(self):
+        """
+            Test filters on the same relation join it only once
+        """
+        from flask_appbuilder.models.sqla.filters import set_value_to_type, join_once, FilterInFunction
+
+        self.insert_data2()
+        view = self.get_view('Model2View')
+        datamodel = view.datamodel
+        _filters = datamodel.get_filters()
+        _filters.add_filter('group.field_string', FilterStartsWith, 'G')
+        _filters.add_filter('group.field_string', FilterEqual, 'G1')
+        _filters.add_filter('field_string', FilterEqual, 'btest')
+        query = _filters.apply_all(self.db.session.query(Model2))
+        eq_(str(query).count('JOIN'), 1)
+        eq_([item.field_string for item in query.all()], ['btest'])
+        count, items = datamodel.query(_filters, 'field_string', 'asc')
+        eq_((count, [item.field_string for item in items]), (1, ['btest']))
+        # relations already joined for ordering are not joined again
+        query = _filters.apply_all(join_once(self.db.session.query(Model2), Model1))
+        eq_(str(query).count('JOIN'), 1)
+        eq_([item.field_string for item in query.all()], ['btest'])
+
+        # queries built while filtering join their own relations
+        def get_g2_pks():
+            inner_filters = datamodel.get_filters()
+            inner_filters.add_filter('group.field_string', FilterEqual, 'G2')
+            return [item.id for item in inner_filters.apply_all(self.db.session.query(Model2))]
+        _filters = datamodel.get_filters()
+        _filters.add_filter('group.field_string', FilterStartsWith, 'G')
+        _filters.add_filter('id', FilterInFunction, get_g2_pks)
+        eq_(_filters.apply_all(self.db.session.query(Model2)).all(), [])
+        eq_(set_value_to_type(datamodel, 'field_integer', 'x'), None)
+        eq_(set_value_to_type(datamodel, 'field_float', '1.5'), 1.5)
+        eq_(set_value_to_type(datamodel, 'field_string', '1'), '1')
+        # configuring new mappers discards the cached column setups
+        from sqlalchemy.orm import configure_mappers
+        from sqlalchemy.ext.declarative import declarative_base
+        from flask_appbuilder.models.sqla import filters
+        ok_(filters._field_setups and filters._value_coercers)
+
+        class FilterCacheModel(declarative_base()):
+            __tablename__ = 'filter_cache_model'
+            id = Column(Integer, primary_key=True)
+        configure_mappers()
+        eq_((filters._field_setups, filters._value_coercers), ({}, {}))
+
+    def test_column_types(self):
+        """
+            Test column types are answered from the precomputed types
+        """
+        from flask_appbuilder.models.sqla.interface import SQLAInterface
+
+        datamodel = SQLAInterface(Model2)
+        ok_(datamodel.is_string('field_string'))
+        ok_(datamodel.is_unique('field_string'))
+        ok_(not datamodel.is_nullable('field_string'))
+        ok_(datamodel.is_nullable('field_integer'))
+        ok_(datamodel.is_integer('field_integer'))
+        ok_(datamodel.is_float('field_float'))
+        ok_(datamodel.is_numeric('field_float'))
+        ok_(datamodel.is_date('field_date'))
+        ok_(datamodel.is_pk('id'))
+        ok_(datamodel.is_fk('group_id'))
+        ok_(datamodel.is_relation('group'))
+        ok_(datamodel.is_relation_many_to_one('group'))
+        ok_(not datamodel.is_relation_many_to_many('group'))
+        ok_(not datamodel.is_nullable('group'))
+        ok_(not datamodel.is_string('group.field_string'))
+        ok_(not datamodel.is_relation('field_string'))
+        eq_(datamodel.get_user_columns_list(),
+            [col for col in datamodel.get_columns_list() if col not in ('id', 'group_id')])
+
+    def test_interface_metadata(self):
+        """
+            Test interfaces of the same model share their metadata
+        """
+        from flask_appbuilder.models.sqla.interface import SQLAInterface
+
+        view = self.get_view('Model2View')
+        related = view.datamodel.get_related_interface('group')
+        other = SQLAInterface(Model1, self.db.session)
+        ok_(related.list_properties is other.list_properties)
+        ok_(related.list_columns is other.list_columns)
+        ok_(related.session is self.db.session)
+        ok_(related.is_unique('field_string'))
+
+        from sqlalchemy.ext.declarative import declarative_base
+        Base = declarative_base()
+
+        class Parent(Base):
+            __tablename__ = 'metadata_parent'
+            id = Column(Integer, primary_key=True)
+        ok_('children' not in SQLAInterface(Parent).list_properties)
+
+        class Child(Base):
+            __tablename__ = 'metadata_child'
+            id = Column(Integer, primary_key=True)
+            parent_id = Column(Integer, ForeignKey('metadata_parent.id'))
+            parent = relationship(Parent, backref='children')
+        SQLAInterface(Child)
+        ok_(SQLAInterface(Parent).is_relation_one_to_many('children'))
+
+    def test_skip_update_perms(self):
+        """
+            Test FAB_UPDATE_PERMS disabled, permissions only synced on demand
+        """
+        from flask import Flask
+        from flask_appbuilder import AppBuilder
+        from flask_appbuilder.security.sqla.models import PermissionView
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///'
+        app.config['SECRET_KEY'] = 'thisismyscretkey'
+        app.config['FAB_UPDATE_PERMS'] = False
+        db = SQLA(app)
+        appbuilder = AppBuilder(app, db.session)
+        eq_(db.session.query(PermissionView).count(), 0)
+        added, removed = appbuilder.sync_permissions()
+        ok_(('can_list', 'RoleModelView') in added)
+        eq_(removed, [])
+        eq_(db.session.query(PermissionView).count(), len(added))
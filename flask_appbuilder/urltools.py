@@ -38,6 +38,82 @@ def get_group_by_args():
     return group_by
 
 
+_re_view_arg = re.compile(r'^_?(page|psize)_(.+)$|^_(cursor|oc|od)_(.+)$')
+_re_filter_arg = re.compile(r'^_flt_(\d+)_(.+)$')
+
+
+def _get_int(value, min_value=0):
+    """
+        Returns value as int or None if it's malformed or lower than min_value
+    """
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    if value < min_value:
+        return None
+    return value
+
+
+class URLArgs(object):
+    """
+        View arguments parsed from the request query string,
+        treat it as read only it's shared by all views on the request
+    """
+
+    def __init__(self, args):
+        self.pages = {}
+        """ { <VIEW_NAME>: PAGE_NUMBER } """
+        self.page_sizes = {}
+        """ { <VIEW_NAME>: PAGE_SIZE } """
+        self.cursors = {}
+        """ { <VIEW_NAME>: CURSOR } """
+        self.orders = {}
+        """ { <VIEW_NAME>: (ORDER_COL, ORDER_DIRECTION) } """
+        self.filters = []
+        """ [(COL_NAME, FILTER_INDEX, VALUE), ...] """
+        order_columns = {}
+        order_directions = {}
+        for arg, value in args.items(multi=False):
+            re_match = _re_view_arg.match(arg)
+            if re_match:
+                prefix, view_name = [group for group in re_match.groups() if group is not None]
+                if prefix == 'page':
+                    value = _get_int(value)
+                    if value is not None:
+                        self.pages[view_name] = value
+                elif prefix == 'psize':
+                    value = _get_int(value, 1)
+                    if value is not None:
+                        self.page_sizes[view_name] = value
+                elif prefix == 'cursor':
+                    self.cursors[view_name] = value
+                elif prefix == 'oc':
+                    order_columns[view_name] = value
+                else:
+                    order_directions[view_name] = value
+                continue
+            re_match = _re_filter_arg.match(arg)
+            if re_match:
+                self.filters.append((re_match.group(2), int(re_match.group(1)), value))
+        for view_name, order_column in order_columns.items():
+            order_direction = order_directions.get(view_name)
+            if order_direction in ('asc', 'desc'):
+                self.orders[view_name] = (order_column, order_direction)
+
+
+def get_url_args():
+    """
+        Returns the URLArgs for the current request,
+        the query string is parsed only once per request
+    """
+    url_args = getattr(request, '_fab_url_args', None)
+    if url_args is None:
+        url_args = URLArgs(request.args)
+        request._fab_url_args = url_args
+    return url_args
+
+
 def get_page_args():
     """
         Get page arguments, returns a dictionary
@@ -46,12 +122,7 @@ def get_page_args():
         Arguments are passed: page_<VIEW_NAME>=<PAGE_NUMBER>
 
     """
-    pages = {}
-    for arg in request.args:
-        re_match = re.findall('page_(.*)', arg)
-        if re_match:
-            pages[re_match[0]] = int(request.args.get(arg))
-    return pages
+    return get_url_args().pages
 
 
 def get_page_size_args():
@@ -62,12 +133,18 @@ def get_page_size_args():
         Arguments are passed: psize_<VIEW_NAME>=<PAGE_SIZE>
 
     """
-    page_sizes = {}
-    for arg in request.args:
-        re_match = re.findall('psize_(.*)', arg)
-        if re_match:
-            page_sizes[re_match[0]] = int(request.args.get(arg))
-    return page_sizes
+    return get_url_args().page_sizes
+
+
+def get_cursor_args():
+    """
+        Get keyset pagination cursor arguments, returns a dictionary
+        { <VIEW_NAME>: CURSOR }
+
+        Arguments are passed: _cursor_<VIEW_NAME>=<CURSOR>
+
+    """
+    return get_url_args().cursors
 
 
 def get_order_args():
@@ -78,19 +155,18 @@ def get_order_args():
         Arguments are passed like: _oc_<VIEW_NAME>=<COL_NAME>&_od_<VIEW_NAME>='asc'|'desc'
 
     """
-    orders = {}
-    for arg in request.args:
-        re_match = re.findall('_oc_(.*)', arg)
-        if re_match:
-            order_direction = request.args.get('_od_' + re_match[0])
-            if order_direction in ('asc', 'desc'):
-                orders[re_match[0]] = (request.args.get(arg), order_direction)
-    return orders
+    return get_url_args().orders
 
 
 def get_filter_args(filters):
+    """
+        Clears filters and adds the filters on the request,
+        arguments are passed like: _flt_<FILTER_INDEX>_<COL_NAME>=<VALUE>,
+        unknown columns and filter indexes are ignored
+    """
     filters.clear_filters()
-    for arg in request.args:
-        re_match = re.findall('_flt_(\d)_(.*)', arg)
-        if re_match:
-            filters.add_filter_index(re_match[0][1], int(re_match[0][0]), request.args.get(arg))
+    for column_name, filter_index, value in get_url_args().filters:
+        try:
+            filters.add_filter_index(column_name, filter_index, value)
+        except (KeyError, IndexError):
+            pass
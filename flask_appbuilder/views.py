@@ -1,8 +1,12 @@
+import csv
+import datetime
 import logging
 import json
 from flask import (
-    flash, redirect, send_file, jsonify, make_response, url_for, session, abort)
-from ._compat import as_unicode, string_types
+    flash, redirect, send_file, jsonify, make_response, url_for, session, abort,
+    Response, stream_with_context)
+from werkzeug.datastructures import MultiDict
+from ._compat import as_unicode, string_types, PY2
 from .filemanager import uuid_originalname
 from .widgets import GroupFormListWidget, ListMasterWidget
 from .baseviews import BaseView, BaseCRUDView, BaseFormView, expose, expose_api
@@ -13,6 +17,32 @@ from .const import FLAMSG_ERR_SEC_ACCESS_DENIED
 log = logging.getLogger(__name__)
 
 
+def _export_json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return as_unicode(value)
+
+
+def _export_csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ', '.join(as_unicode(v) for v in value)
+    return as_unicode(value)
+
+
+class _CSVLine(object):
+    """
+        File like target for csv.writer, keeps the last written line
+    """
+    line = ''
+
+    def write(self, line):
+        self.line = line
+
+
 class IndexView(BaseView):
     """
         A simple view that implements the index for the site
@@ -133,6 +163,25 @@ class RestCRUDView(BaseCRUDView):
         This class view exposes REST method for CRUD operations on you models
     """
 
+    export_batch_size = 1000
+    """ Number of rows fetched from the database on each batch when exporting """
+
+    bulk_batch_size = 500
+    """ Number of items persisted on each commit by the bulk create and update API """
+
+    related_page_size = 20
+    """ Number of choices returned on each page by api_column_add and api_column_edit """
+    related_max_page_size = 100
+    """ Max page_size accepted by api_column_add and api_column_edit """
+    related_label_columns = None
+    """
+        Dictionary with the related model column searched, case insensitive,
+        by the q argument of api_column_add and api_column_edit, for each
+        related column. Defaults to the first string column::
+
+            related_label_columns = {'group': 'name'}
+    """
+
     def _search_form_json(self):
         pass
 
@@ -149,8 +198,15 @@ class RestCRUDView(BaseCRUDView):
         api_urls['delete'] = url_for(view_name + ".api_delete", pk="")
         api_urls['create'] = url_for(view_name + ".api_create")
         api_urls['update'] = url_for(view_name + ".api_update", pk="")
+        api_urls['export'] = url_for(view_name + ".api_export", export_format="")
+        api_urls['bulk_create'] = url_for(view_name + ".api_bulk_create")
+        api_urls['bulk_update'] = url_for(view_name + ".api_bulk_update")
         return api_urls
 
+    def _get_related_endpoint_func(self, form_type):
+        view_name = self.__class__.__name__
+        return lambda col_name: url_for(view_name + ".api_column_" + form_type, col_name=col_name)
+
     def _get_modelview_urls(self, modelview_urls=None):
         view_name = self.__class__.__name__
         modelview_urls = modelview_urls or {}
@@ -213,9 +269,16 @@ class RestCRUDView(BaseCRUDView):
             order_column, order_direction = '', ''
         page = get_page_args().get(self.__class__.__name__)
         page_size = get_page_size_args().get(self.__class__.__name__)
-        get_filter_args(self._filters)
-        joined_filters = self._filters.get_joined_filters(self._base_filters)
-        count, lst = self.datamodel.query(joined_filters, order_column, order_direction, page=page, page_size=page_size)
+        cursor = get_cursor_args().get(self.__class__.__name__)
+        if cursor and not self.datamodel.is_valid_cursor(cursor, order_column, order_direction):
+            return make_response(jsonify({'message': 'Invalid cursor'}), 400)
+        filters = self._get_request_filters()
+        joined_filters = filters.get_joined_filters(self._base_filters)
+        count, has_next, lst = self._query_page(joined_filters, order_column, order_direction,
+                                                page=page, page_size=page_size, cursor=cursor)
+        next_cursor = None
+        if has_next:
+            next_cursor = self.datamodel.encode_cursor(lst[-1], order_column)
         result = self.datamodel.get_values_json(lst, self.list_columns)
         pks = self.datamodel.get_keys(lst)
         ret_json = jsonify(label_columns=self._label_columns_json(),
@@ -224,6 +287,8 @@ class RestCRUDView(BaseCRUDView):
                            page=page,
                            page_size=page_size,
                            count=count,
+                           has_next=has_next,
+                           next_cursor=next_cursor,
                            modelview_name=self.__class__.__name__,
                            pks=pks,
                            result=result)
@@ -264,10 +329,10 @@ class RestCRUDView(BaseCRUDView):
     @has_access_api
     @permission_name('add')
     def api_create(self):
-        get_filter_args(self._filters)
-        exclude_cols = self._filters.get_relation_cols()
+        filters = self._get_request_filters()
+        exclude_cols = filters.get_relation_cols()
         form = self.add_form.refresh()
-        self._fill_form_exclude_cols(exclude_cols, form)
+        self._fill_form_exclude_cols(exclude_cols, form, filters)
         if form.validate():
             item = self.datamodel.obj()
             form.populate_obj(item)
@@ -294,8 +359,8 @@ class RestCRUDView(BaseCRUDView):
     @has_access_api
     @permission_name('edit')
     def api_update(self, pk):
-        get_filter_args(self._filters)
-        exclude_cols = self._filters.get_relation_cols()
+        filters = self._get_request_filters()
+        exclude_cols = filters.get_relation_cols()
 
         item = self.datamodel.get(pk, self._base_filters)
         if not item:
@@ -305,7 +370,7 @@ class RestCRUDView(BaseCRUDView):
 
         form = self.edit_form.refresh(request.form)
         # fill the form with the suppressed cols, generated from exclude_cols
-        self._fill_form_exclude_cols(exclude_cols, form)
+        self._fill_form_exclude_cols(exclude_cols, form, filters)
         # trick to pass unique validation
         form._id = pk
         http_return_code = 500
@@ -336,6 +401,163 @@ class RestCRUDView(BaseCRUDView):
             }
         return make_response(jsonify(payload), http_return_code)
 
+    @staticmethod
+    def _bulk_formdata(data):
+        """
+            Converts a JSON object into form data, lists are
+            sent as multiple values for the same key
+        """
+        formdata = MultiDict()
+        for key, value in data.items():
+            values = value if isinstance(value, list) else [value]
+            for value in values:
+                if value is None:
+                    value = ''
+                elif not isinstance(value, bool):
+                    value = as_unicode(value)
+                formdata.add(key, value)
+        return formdata
+
+    def _bulk_save(self, pending, save, post, results, prepare=None):
+        """
+            Persists validated items, committing each bulk_batch_size items.
+            If a batch fails all its items are reported with the error.
+
+            :param pending: list of (index, item) tuples
+            :param save: datamodel method that persists a list of items
+            :param post: post hook called for each persisted item
+            :param results: list of per item results, filled by index
+            :param prepare: optional function called with (index, item) just
+                before the item's batch is saved, items of the session must be
+                changed here so that they are not flushed with earlier batches.
+                Returns False if the item can't be saved, and fills its result.
+        """
+        for i in range(0, len(pending), self.bulk_batch_size):
+            batch = pending[i:i + self.bulk_batch_size]
+            if prepare:
+                batch = [(index, item) for index, item in batch if prepare(index, item)]
+                if not batch:
+                    continue
+            if save([item for index, item in batch]):
+                for index, item in batch:
+                    post(item)
+                    if results[index] is None:
+                        results[index] = {'index': index, 'status': 'ok',
+                                          'pk': self.datamodel.get_pk_value(item)}
+                    else:
+                        results[index]['status'] = 'ok'
+            else:
+                for index, item in batch:
+                    results[index] = {'index': index, 'status': 'error',
+                                      'message': as_unicode(self.datamodel.message[0]),
+                                      'severity': self.datamodel.message[1]}
+
+    def _bulk_response(self, results):
+        http_return_code = 200
+        if any(result['status'] != 'ok' for result in results):
+            http_return_code = 500
+        return make_response(jsonify({'results': results}), http_return_code)
+
+    @expose_api(name='bulk_create', url='/api/bulk/create', methods=['POST'])
+    @has_access_api
+    @permission_name('add')
+    def api_bulk_create(self):
+        """
+            Creates a JSON array of items, each one is validated with
+            add_form, valid ones are saved every bulk_batch_size items.
+            Returns a result for each item, in the same order.
+        """
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return make_response(jsonify({'message': 'Expected a JSON array'}), 400)
+        filters = self._get_request_filters()
+        exclude_cols = filters.get_relation_cols()
+        results = [None] * len(data)
+        pending = []
+        for index, item_data in enumerate(data):
+            if not isinstance(item_data, dict):
+                results[index] = {'index': index, 'status': 'error', 'message': 'Expected a JSON object'}
+                continue
+            # the request is JSON only, forms can't be posted cross site
+            form = self.add_form(formdata=self._bulk_formdata(item_data), meta={'csrf': False})
+            self._fill_form_exclude_cols(exclude_cols, form, filters)
+            if not form.validate():
+                results[index] = {'index': index, 'status': 'error',
+                                  'message': 'Validation error', 'error_details': form.errors}
+                continue
+            item = self.datamodel.obj()
+            form.populate_obj(item)
+            try:
+                self.pre_add(item)
+            except Exception as e:
+                results[index] = {'index': index, 'status': 'error', 'message': str(e)}
+                continue
+            pending.append((index, item))
+        self._bulk_save(pending, self.datamodel.add_all, self.post_add, results)
+        return self._bulk_response(results)
+
+    @expose_api(name='bulk_update', url='/api/bulk/update', methods=['PUT'])
+    @has_access_api
+    @permission_name('edit')
+    def api_bulk_update(self):
+        """
+            Updates a JSON array of items, each one must have the primary key
+            and is validated with edit_form, only the keys sent are changed.
+            Items are loaded in one go, changed and saved every bulk_batch_size items.
+            Returns a result for each item, in the same order.
+        """
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return make_response(jsonify({'message': 'Expected a JSON array'}), 400)
+        filters = self._get_request_filters()
+        exclude_cols = filters.get_relation_cols()
+        pk_name = self.datamodel.get_pk_name()
+        pks = [item_data.get(pk_name) for item_data in data
+               if isinstance(item_data, dict) and item_data.get(pk_name) is not None]
+        items = dict((as_unicode(self.datamodel.get_pk_value(item)), item)
+                     for item in self.datamodel.get_many(pks, self._base_filters))
+        results = [None] * len(data)
+        pending = []
+        forms = {}
+        for index, item_data in enumerate(data):
+            if not isinstance(item_data, dict):
+                results[index] = {'index': index, 'status': 'error', 'message': 'Expected a JSON object'}
+                continue
+            item = items.get(as_unicode(item_data.get(pk_name)))
+            if not item:
+                results[index] = {'index': index, 'status': 'error', 'message': 'Not found'}
+                continue
+            pk = self.datamodel.get_pk_value(item)
+            item_data = dict((key, value) for key, value in item_data.items() if key != pk_name)
+            form = self.edit_form(formdata=self._bulk_formdata(item_data), meta={'csrf': False})
+            self._fill_form_exclude_cols(exclude_cols, form, filters)
+            # only the keys sent are validated and changed
+            for field in set(form._fields.keys()) - set(item_data.keys()) - set(exclude_cols):
+                delattr(form, field)
+            # trick to pass unique validation
+            form._id = pk
+            if not form.validate():
+                results[index] = {'index': index, 'status': 'error', 'pk': pk,
+                                  'message': 'Validation error', 'error_details': form.errors}
+                continue
+            forms[index] = form
+            results[index] = {'index': index, 'status': 'pending', 'pk': pk}
+            pending.append((index, item))
+
+        def prepare(index, item):
+            # items are changed only when their batch is saved
+            forms.pop(index).populate_obj(item)
+            try:
+                self.pre_update(item)
+            except Exception as e:
+                self.datamodel.discard_changes(item)
+                results[index].update({'status': 'error', 'message': str(e)})
+                return False
+            return True
+
+        self._bulk_save(pending, self.datamodel.edit_all, self.post_update, results, prepare)
+        return self._bulk_response(results)
+
     @expose_api(name='delete', url='/api/delete/<pk>', methods=['DELETE'])
     @has_access_api
     @permission_name('delete')
@@ -354,7 +576,23 @@ class RestCRUDView(BaseCRUDView):
         response.headers['Content-Type'] = "application/json"
         return response
 
+    def _get_related_label_column(self, col_name, rel_datamodel):
+        """
+            Returns the related model column searched by the q argument
+        """
+        if self.related_label_columns and col_name in self.related_label_columns:
+            return self.related_label_columns[col_name]
+        for rel_col_name in rel_datamodel.get_search_columns_list():
+            if rel_datamodel.is_string(rel_col_name):
+                return rel_col_name
+
     def _get_related_column_data(self, col_name, filters):
+        """
+            Returns one page of related choices on select2's format
+            {"results": [{"id", "text"}, ...], "more": bool},
+            accepts q, page and page_size arguments.
+            Without any of them returns the legacy list of all choices.
+        """
         rel_datamodel = self.datamodel.get_related_interface(col_name)
         _filters = rel_datamodel.get_filters(rel_datamodel.get_search_columns_list())
         get_filter_args(_filters)
@@ -362,20 +600,33 @@ class RestCRUDView(BaseCRUDView):
             filters = _filters.add_filter_list(filters)
         else:
             filters = _filters
-        result = rel_datamodel.query(filters)[1]
-        ret_list = list()
-        for item in result:
-            pk = rel_datamodel.get_pk_value(item)
-            ret_list.append({'id': int(pk), 'text': str(item)})
-        ret_json = json.dumps(ret_list)
-        return ret_json
+        if not any(arg in request.args for arg in ('q', 'page', 'page_size')):
+            result = rel_datamodel.query(filters)[1]
+            ret_list = list()
+            for item in result:
+                pk = rel_datamodel.get_pk_value(item)
+                ret_list.append({'id': int(pk), 'text': str(item)})
+            return json.dumps(ret_list)
+        q = request.args.get('q', '')
+        label_column = self._get_related_label_column(col_name, rel_datamodel)
+        if q and label_column:
+            filters.add_filter(label_column, rel_datamodel.FilterIContains, q)
+        page = max(request.args.get('page', 0, type=int), 0)
+        page_size = request.args.get('page_size', self.related_page_size, type=int)
+        page_size = min(max(page_size, 1), self.related_max_page_size)
+        lst = rel_datamodel.query(filters, page=page, page_size=page_size, with_count=False)[1]
+        lst = list(lst)
+        results = [{'id': as_unicode(rel_datamodel.get_pk_value(item)), 'text': as_unicode(item)}
+                   for item in lst[:page_size]]
+        return json.dumps({'results': results, 'more': len(lst) > page_size})
 
     @expose_api(name='column_add', url='/api/column/add/<col_name>', methods=['GET'])
     @has_access_api
     @permission_name('add')
     def api_column_add(self, col_name):
         """
-            Returns list of (pk, object) nice to use on select2.
+            Returns list of (pk, object) nice to use on select2,
+            or one page of them when given q, page or page_size.
             Use only for related columns.
             Always filters with add_form_query_rel_fields, and accepts extra filters
             on endpoint arguments.
@@ -395,7 +646,8 @@ class RestCRUDView(BaseCRUDView):
     @permission_name('edit')
     def api_column_edit(self, col_name):
         """
-            Returns list of (pk, object) nice to use on select2.
+            Returns list of (pk, object) nice to use on select2,
+            or one page of them when given q, page or page_size.
             Use only for related columns.
             Always filters with edit_form_query_rel_fields, and accepts extra filters
             on endpoint arguments.
@@ -404,7 +656,7 @@ class RestCRUDView(BaseCRUDView):
         """
         filter_rel_fields = None
         if self.edit_form_query_rel_fields:
-            filter_rel_fields = self.edit_form_query_rel_fields
+            filter_rel_fields = self.edit_form_query_rel_fields.get(col_name)
         ret_json = self._get_related_column_data(col_name, filter_rel_fields)
         response = make_response(ret_json, 200)
         response.headers['Content-Type'] = "application/json"
@@ -421,8 +673,8 @@ class RestCRUDView(BaseCRUDView):
             order_column, order_direction = get_order_args().get(self.__class__.__name__)
         else:
             order_column, order_direction = '', ''
-        get_filter_args(self._filters)
-        joined_filters = self._filters.get_joined_filters(self._base_filters)
+        filters = self._get_request_filters()
+        joined_filters = filters.get_joined_filters(self._base_filters)
         count, result = self.datamodel.query(joined_filters, order_column, order_direction)
 
         ret_list = list()
@@ -435,6 +687,59 @@ class RestCRUDView(BaseCRUDView):
         response.headers['Content-Type'] = "application/json"
         return response
 
+    def _get_export_values(self, item):
+        values = self.datamodel.get_values_item(item, self.list_columns)
+        for i, col in enumerate(self.list_columns):
+            if col in self.formatters_columns:
+                values[i] = self.formatters_columns[col](values[i])
+        return values
+
+    def _export_csv(self, items):
+        line = _CSVLine()
+        writer = csv.writer(line)
+        writer.writerow(self.list_columns)
+        yield line.line
+        for item in items:
+            values = [_export_csv_value(value) for value in self._get_export_values(item)]
+            if PY2:
+                values = [value.encode('utf-8') for value in values]
+            writer.writerow(values)
+            yield line.line
+
+    def _export_ndjson(self, items):
+        for item in items:
+            values = dict(zip(self.list_columns, self._get_export_values(item)))
+            yield json.dumps(values, default=_export_json_default) + '\n'
+
+    @expose_api(name='export', url='/api/export/<export_format>', methods=['GET'])
+    @has_access_api
+    @permission_name('list')
+    def api_export(self, export_format):
+        """
+            Streams all the filtered and ordered list rows
+            as CSV (csv) or JSON lines (ndjson), with list_columns.
+        """
+        if export_format not in ('csv', 'ndjson'):
+            abort(404)
+        if get_order_args().get(self.__class__.__name__):
+            order_column, order_direction = get_order_args().get(self.__class__.__name__)
+        elif self.base_order:
+            order_column, order_direction = self.base_order
+        else:
+            order_column, order_direction = '', ''
+        filters = self._get_request_filters()
+        joined_filters = filters.get_joined_filters(self._base_filters)
+        items = self.datamodel.query_iter(joined_filters, order_column, order_direction,
+                                          select_columns=self.list_columns,
+                                          batch_size=self.export_batch_size)
+        if export_format == 'csv':
+            generator, mimetype = self._export_csv(items), 'text/csv'
+        else:
+            generator, mimetype = self._export_ndjson(items), 'application/x-ndjson'
+        response = Response(stream_with_context(generator), mimetype=mimetype)
+        response.headers['Content-Disposition'] = 'attachment; filename={0}.{1}'.format(
+            self.__class__.__name__, export_format)
+        return response
 
 
 class ModelView(RestCRUDView):
@@ -570,7 +875,7 @@ class ModelView(RestCRUDView):
         pks = request.form.getlist('rowid')
         if self.appbuilder.sm.has_access(name, self.__class__.__name__):
             action = self.actions.get(name)
-            items = [self.datamodel.get(pk) for pk in pks]
+            items = self.datamodel.get_many(pks, self._base_filters)
             return action.func(items)
         else:
             flash(as_unicode(FLAMSG_ERR_SEC_ACCESS_DENIED), "danger")
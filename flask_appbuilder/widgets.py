@@ -151,6 +151,7 @@ class ListWidget(RenderTemplateWidget):
         page = None
         page_size = None
         count = 0
+        has_next = False
         pks = []
         actions = None
         filters = {}